@@ -1,12 +1,58 @@
-from sqlalchemy.orm import Session, joinedload
+import threading
+from datetime import datetime, timezone
+
+from cachetools import TTLCache
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session, make_transient_to_detached, selectinload
 
 import models
 import schemas
 import security
 
 
+# Read queries are built once at import time and executed with bound
+# parameters, instead of constructing a new Query on every call.
+
+# -----------------------------------------------------------------------------
+# User lookup cache
+#
+# get_current_user looks the user up by username on every authenticated
+# request, but user rows rarely change. The row's column values (not the ORM
+# object, which belongs to a single session) are cached per process for a short
+# TTL and re-attached to the caller's session without a SELECT. update_user and
+# delete_user invalidate entries; other worker processes see changes once
+# their entry expires.
+# -----------------------------------------------------------------------------
+USER_CACHE_TTL = 30  # seconds
+
+_SELECT_USER_BY_USERNAME = select(models.User).where(models.User.username == bindparam("username"))
+
+_user_cache = TTLCache(maxsize=1024, ttl=USER_CACHE_TTL)
+_user_cache_lock = threading.Lock()
+_USER_CACHE_COLUMNS = ("id", "username", "hashed_password", "is_admin")
+
+
 def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+    with _user_cache_lock:
+        cached = _user_cache.get(username)
+    if cached is not None:
+        user = models.User(**cached)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    user = db.scalars(_SELECT_USER_BY_USERNAME, {"username": username}).first()
+    if user is not None:
+        with _user_cache_lock:
+            _user_cache[username] = {column: getattr(user, column) for column in _USER_CACHE_COLUMNS}
+    return user
+
+
+def _forget_cached_user(user_id: int):
+    """Drop any cached lookup for the given user id."""
+    with _user_cache_lock:
+        for username, row in list(_user_cache.items()):
+            if row["id"] == user_id:
+                del _user_cache[username]
 
 
 def create_user(db: Session, user: schemas.UserCreate):
@@ -14,11 +60,20 @@ def create_user(db: Session, user: schemas.UserCreate):
     db_user = models.User(username=user.username, hashed_password=hashed_password, is_admin=user.is_admin)
     db.add(db_user)
     db.commit()
-    db.refresh(db_user)
     return db_user
 
 
-def create_file_metadata(db: Session, file: schemas.FileMetadataCreate, owner_id: int):
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    """Store a new password hash for a user (e.g. after a rehash on login)."""
+    db.execute(
+        update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password)
+    )
+    db.commit()
+    _forget_cached_user(user_id)
+
+
+def create_file_metadata(db: Session, file: schemas.FileMetadataCreate, owner_id: int, commit: bool = True):
+    """Add a file row; with commit=False it is left for the caller's transaction."""
     db_file = models.FileMetadata(
         filename=file.filename,
         folder=file.folder,
@@ -27,13 +82,13 @@ def create_file_metadata(db: Session, file: schemas.FileMetadataCreate, owner_id
         instruction=file.instruction
     )
     db.add(db_file)
-    db.commit()
-    db.refresh(db_file)
+    if commit:
+        db.commit()
     return db_file
 
 
 def get_file_by_id(db: Session, file_id: int):
-    return db.query(models.FileMetadata).filter(models.FileMetadata.id == file_id).first()
+    return db.get(models.FileMetadata, file_id)
 
 
 def delete_file_metadata(db: Session, file: models.FileMetadata):
@@ -41,86 +96,392 @@ def delete_file_metadata(db: Session, file: models.FileMetadata):
     db.commit()
 
 
-def create_activity_log(db: Session, log: schemas.ActivityLogCreate, user_id: int):
-    db_log = models.ActivityLog(**log.model_dump(), user_id=user_id)
-    db.add(db_log)
+_SELECT_FILES_BY_IDS = select(models.FileMetadata).where(
+    models.FileMetadata.id.in_(bindparam("ids", expanding=True))
+)
+
+
+def get_files_by_ids(db: Session, file_ids):
+    """Fetch the given files with one IN query; returns {id: file} (missing ids are absent)."""
+    if not file_ids:
+        return {}
+    return {f.id: f for f in db.scalars(_SELECT_FILES_BY_IDS, {"ids": list(file_ids)})}
+
+
+def delete_files_metadata(db: Session, file_ids):
+    """
+    Delete many file rows (and their version rows) with bulk DELETEs and a
+    single commit, instead of one delete + commit per file.
+    """
+    if not file_ids:
+        return
+    file_ids = list(file_ids)
+    # Explicit because the ORM delete-orphan cascade doesn't run for bulk
+    # deletes, and SQLite doesn't enforce ON DELETE CASCADE by default
+    db.execute(delete(models.FileVersion).where(models.FileVersion.file_id.in_(file_ids)))
+    db.execute(delete(models.FileMetadata).where(models.FileMetadata.id.in_(file_ids)))
     db.commit()
-    db.refresh(db_log)
-    return db_log
+
+
+def move_files_metadata(db: Session, file_ids, folder: str):
+    """Set folder on many file rows with one UPDATE. Not committed."""
+    if not file_ids:
+        return
+    db.execute(
+        update(models.FileMetadata)
+        .where(models.FileMetadata.id.in_(sorted(file_ids)))
+        .values(folder=folder)
+    )
+
+
+def delete_files_in_folder(db: Session, folder: str) -> int:
+    """
+    Delete the rows of every file in folder or any of its subfolders with bulk
+    DELETEs and one commit. Returns the number of file rows deleted.
+
+    Matches folder itself and "folder/..." only, so deleting "Ops" leaves
+    "Operations" alone; both predicates can use the index on folder.
+    """
+    in_folder = (models.FileMetadata.folder == folder) | models.FileMetadata.folder.like(
+        escape_like(folder) + "/%", escape=LIKE_ESCAPE
+    )
+    file_ids = select(models.FileMetadata.id).where(in_folder).scalar_subquery()
+    db.execute(
+        delete(models.FileVersion).where(models.FileVersion.file_id.in_(file_ids)),
+        execution_options={"synchronize_session": False},
+    )
+    result = db.execute(
+        delete(models.FileMetadata).where(in_folder),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    return result.rowcount
+
+
+def create_file_version(
+    db: Session, file_id: int, filename: str, file_path: str, size: int, created_by_id: int
+) -> int:
+    """
+    Add a version row numbered one past the file's latest version and return
+    that number. The number is computed by a subquery inside the INSERT, so
+    this is one statement instead of a SELECT max + INSERT round-trip. Not
+    committed: it belongs to the caller's transaction.
+    """
+    next_number = (
+        select(func.coalesce(func.max(models.FileVersion.version_number), 0) + 1)
+        .where(models.FileVersion.file_id == file_id)
+        .scalar_subquery()
+    )
+    return db.scalar(
+        insert(models.FileVersion)
+        .values(
+            file_id=file_id,
+            version_number=next_number,
+            filename=filename,
+            file_path=file_path,
+            size=size,
+            created_by_id=created_by_id,
+        )
+        .returning(models.FileVersion.version_number)
+    )
+
+
+# -----------------------------------------------------------------------------
+# Activity log write-behind buffer
+#
+# Activity log rows are fire-and-forget for the request that records them, so
+# instead of one INSERT + COMMIT per action they are buffered in-process and
+# written with a single multi-row INSERT once a batch fills up or a timer
+# started by the first queued entry fires after ACTIVITY_LOG_MAX_DELAY seconds.
+# Batches are written through a short-lived session of their own, never the
+# caller's request session, and rows whose INSERT fails go back on the queue.
+# Readers of the log flush first (read-your-writes within a process), and
+# main.lifespan flushes on shutdown.
+# -----------------------------------------------------------------------------
+ACTIVITY_LOG_BATCH_SIZE = 100
+ACTIVITY_LOG_MAX_DELAY = 5.0  # seconds
+
+_pending_logs = []  # (bind, row) pairs; bind is the engine the row belongs to
+_pending_lock = threading.Lock()
+_flush_timer = None
+
+
+def _schedule_flush():
+    """Start the max-delay timer unless one is already running; call with _pending_lock held."""
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(ACTIVITY_LOG_MAX_DELAY, flush_activity_logs)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def create_activity_log(db: Session, log: schemas.ActivityLogCreate, user_id: int):
+    """Queue an activity log entry; it is written with the next batch."""
+    row = {**log.model_dump(), "user_id": user_id, "timestamp": datetime.now(timezone.utc)}
+    with _pending_lock:
+        _pending_logs.append((db.get_bind(), row))
+        _schedule_flush()
+        due = len(_pending_logs) >= ACTIVITY_LOG_BATCH_SIZE
+    if due:
+        flush_activity_logs()
+
+
+def flush_activity_logs():
+    """
+    Write all buffered activity log entries.
+
+    Each engine's rows are inserted and committed in a session of their own;
+    rows that fail are put back at the front of the queue for the next flush.
+    """
+    global _flush_timer
+    with _pending_lock:
+        batch = _pending_logs[:]
+        _pending_logs.clear()
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+    if not batch:
+        return
+
+    rows_by_bind = {}
+    for bind, row in batch:
+        rows_by_bind.setdefault(bind, []).append(row)
+
+    failed = []
+    for bind, rows in rows_by_bind.items():
+        try:
+            with Session(bind=bind) as session, session.begin():
+                session.execute(insert(models.ActivityLog), rows)
+        except Exception as e:
+            print(f"❌ Failed to write {len(rows)} activity log entries, will retry: {e}")
+            failed.extend((bind, row) for row in rows)
+
+    if failed:
+        with _pending_lock:
+            _pending_logs[:0] = failed
+            _schedule_flush()
+
+
+_SELECT_ACTIVITY_LOGS = (
+    select(models.ActivityLog)
+    .order_by(models.ActivityLog.timestamp.desc())
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
 
 
 def get_activity_logs(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.ActivityLog).order_by(models.ActivityLog.timestamp.desc()).offset(skip).limit(limit).all()
+    flush_activity_logs()
+    return db.scalars(_SELECT_ACTIVITY_LOGS, {"skip": skip, "limit": limit}).all()
+
+
+# Statements returning files for a FileMetadata response load owner and
+# assigned_to up front (one extra IN query each) instead of per row while
+# the response is serialized
+_FILE_USERS = (
+    selectinload(models.FileMetadata.owner),
+    selectinload(models.FileMetadata.assigned_to),
+)
+
+_SELECT_FILES_BY_FOLDER = (
+    select(models.FileMetadata)
+    .options(*_FILE_USERS)
+    .where(models.FileMetadata.folder == bindparam("folder"))
+)
 
 
 def get_files_by_folder(db: Session, folder: str):
-    return db.query(models.FileMetadata).filter(models.FileMetadata.folder == folder).all()
+    return db.scalars(_SELECT_FILES_BY_FOLDER, {"folder": folder}).all()
+
+
+LIKE_ESCAPE = "!"  # Not "/" or "\\": patterns also match folder paths
+
+
+def escape_like(text: str) -> str:
+    """Escape %, _ and LIKE_ESCAPE in text so a LIKE pattern matches it literally."""
+    for char in (LIKE_ESCAPE, "%", "_"):
+        text = text.replace(char, LIKE_ESCAPE + char)
+    return text
+
+
+def contains_pattern(text: str) -> str:
+    """
+    Build a substring LIKE pattern for user input, to be bound as a parameter
+    and matched with ``escape=LIKE_ESCAPE``.
+
+    Searches stay plain ILIKE so Postgres can serve them from the filename
+    trigram index; %, _ and the escape character in the input are matched
+    literally.
+    """
+    return f"%{escape_like(text)}%"
+
+
+_SEARCH_FILES = (
+    select(models.FileMetadata)
+    .options(*_FILE_USERS)
+    .where(models.FileMetadata.filename.ilike(bindparam("pattern"), escape=LIKE_ESCAPE))
+)
 
 
 def search_files(db: Session, query_str: str):
-    return db.query(models.FileMetadata).filter(models.FileMetadata.filename.ilike(f"%{query_str}%")).all()
+    return db.scalars(_SEARCH_FILES, {"pattern": contains_pattern(query_str)}).all()
+
+
+_SELECT_FILE_BY_FOLDER_AND_NAME = (
+    select(models.FileMetadata)
+    .where(
+        models.FileMetadata.folder == bindparam("folder"),
+        models.FileMetadata.filename == bindparam("filename"),
+    )
+    .limit(1)
+)
 
 
 def get_file_by_folder_and_name(db: Session, folder: str, filename: str):
-    return db.query(models.FileMetadata).filter(models.FileMetadata.folder == folder, models.FileMetadata.filename == filename).first()
+    return db.scalars(_SELECT_FILE_BY_FOLDER_AND_NAME, {"folder": folder, "filename": filename}).first()
 
 
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.get(models.User, user_id)
+
+
+_SELECT_USERS = select(models.User).offset(bindparam("skip")).limit(bindparam("limit"))
+_SEARCH_USERS = _SELECT_USERS.where(models.User.username.ilike(bindparam("pattern"), escape=LIKE_ESCAPE))
 
 
 def get_users(db: Session, skip: int = 0, limit: int = 100, search: str = None):
-    query = db.query(models.User)
+    params = {"skip": skip, "limit": limit}
     if search:
-        query = query.filter(models.User.username.ilike(f"%{search}%"))
-    return query.offset(skip).limit(limit).all()
+        return db.scalars(_SEARCH_USERS, {**params, "pattern": contains_pattern(search)}).all()
+    return db.scalars(_SELECT_USERS, params).all()
 
 
 def update_user(db: Session, user_id: int, user: schemas.UserUpdate):
-    db_user = get_user(db, user_id)
-    if not db_user:
-        return None
     user_data = user.model_dump(exclude_unset=True)
-    for key, value in user_data.items():
-        setattr(db_user, key, value)
+    if not user_data:
+        return get_user(db, user_id)
+
+    # Single UPDATE ... RETURNING instead of SELECT followed by UPDATE
+    db_user = db.scalars(
+        update(models.User).where(models.User.id == user_id).values(**user_data).returning(models.User)
+    ).one_or_none()
+    if db_user is None:
+        return None
     db.commit()
-    db.refresh(db_user)
+    _forget_cached_user(user_id)
     return db_user
 
 
 def delete_user(db: Session, user_id: int):
+    # Deleted through the ORM so related rows get their foreign keys cleared
     db_user = get_user(db, user_id)
     if not db_user:
         return None
     db.delete(db_user)
     db.commit()
+    _forget_cached_user(user_id)
     return db_user
 
 
-def update_file_metadata(db: Session, file_id: int, file_update: schemas.FileMetadataUpdate):
+# Fields update_file_metadata never sets to an empty value
+_REQUIRED_FILE_FIELDS = ("filename", "folder")
+
+
+def update_file_metadata(
+    db: Session, file_id: int, file_update: schemas.FileMetadataUpdate, commit: bool = True
+):
+    """Apply file_update to a file row; with commit=False it is left for the caller's transaction."""
     db_file = get_file_by_id(db, file_id)
     if not db_file:
         return None
     
-    # Update fields if provided
-    if file_update.filename:
-        db_file.filename = file_update.filename
-    if file_update.folder:
-        db_file.folder = file_update.folder
-    if file_update.assigned_to_id is not None:
-        db_file.assigned_to_id = file_update.assigned_to_id
-    if file_update.instruction is not None:
-        db_file.instruction = file_update.instruction
-    if file_update.status is not None:
-        db_file.status = file_update.status
-        
-    db.commit()
-    db.refresh(db_file)
+    # Only fields the caller provided, and only those that actually differ.
+    # An empty filename or folder is ignored, as it always was.
+    changes = {
+        key: value
+        for key, value in file_update.model_dump(exclude_unset=True, exclude_none=True).items()
+        if (value or key not in _REQUIRED_FILE_FIELDS) and getattr(db_file, key) != value
+    }
+    if not changes:
+        return db_file
+
+    for key, value in changes.items():
+        setattr(db_file, key, value)
+    if commit:
+        db.commit()
     return db_file
 
 
+def assign_files(db: Session, file_ids, assigned_to_id: int, instruction=None, due_date=None):
+    """
+    Assign the given files (directories excluded) to a user with one
+    UPDATE ... RETURNING, and return (id, filename) of the rows updated.
+
+    instruction and due_date are only overwritten when given. Not committed:
+    the caller adds its notifications and log to the same transaction.
+    """
+    if not file_ids:
+        return []
+    values = {"assigned_to_id": assigned_to_id, "status": "Pending"}
+    if instruction:
+        values["instruction"] = instruction
+    if due_date:
+        values["due_date"] = due_date
+    stmt = (
+        update(models.FileMetadata)
+        # Sorted so concurrent bulk assignments lock rows in the same order
+        .where(models.FileMetadata.id.in_(sorted(set(file_ids))), models.FileMetadata.is_dir.isnot(True))
+        .values(**values)
+        .returning(models.FileMetadata.id, models.FileMetadata.filename)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).all()
+
+
+_SELECT_FILES_ASSIGNED_TO_USER = (
+    select(models.FileMetadata)
+    .options(*_FILE_USERS)
+    .where(models.FileMetadata.assigned_to_id == bindparam("user_id"))
+)
+
+
 def get_files_assigned_to_user(db: Session, user_id: int):
-    return db.query(models.FileMetadata).filter(models.FileMetadata.assigned_to_id == user_id).all()
+    return db.scalars(_SELECT_FILES_ASSIGNED_TO_USER, {"user_id": user_id}).all()
+
+
+ASSIGNED_FILES_BATCH_SIZE = 200
+
+_SELECT_ALL_ASSIGNED_FILES = (
+    select(models.FileMetadata)
+    .options(*_FILE_USERS)
+    .where(models.FileMetadata.assigned_to_id.is_not(None))
+    .execution_options(yield_per=ASSIGNED_FILES_BATCH_SIZE)
+)
+
 
 def get_all_assigned_files(db: Session):
-    return db.query(models.FileMetadata).options(joinedload(models.FileMetadata.assigned_to)).filter(models.FileMetadata.assigned_to_id != None).all()
+    """
+    Stream every assigned file, fetched from the database in batches.
+
+    Returns an iterator rather than a list so callers can serialize rows as
+    they arrive; owner and assignee are loaded once per batch.
+    """
+    return db.scalars(_SELECT_ALL_ASSIGNED_FILES)
+
+
+_SELECT_ASSIGNED_FILES_SUMMARY = select(
+    models.FileMetadata.id,
+    models.FileMetadata.filename,
+    models.FileMetadata.folder,
+    models.User.username.label("assigned_to"),
+).join(models.User, models.FileMetadata.assigned_to_id == models.User.id)
+
+
+def get_assigned_files_summary(db: Session):
+    """
+    Lightweight variant of get_all_assigned_files for list views.
+
+    Selects only the columns the list needs (no ORM objects, no identity map),
+    joined to the assignee's username in the same query.
+    """
+    return db.execute(_SELECT_ASSIGNED_FILES_SUMMARY).all()
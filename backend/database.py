@@ -4,36 +4,66 @@ Database Configuration for CDRRMO File Manager
 This module sets up the SQLAlchemy database connection with connection pooling.
 
 CONNECTION POOLING EXPLAINED:
-- pool_size=5: Keep 5 database connections ready at all times
-- max_overflow=10: Allow up to 10 extra connections during high load
+- pool_size=20: Keep 20 database connections ready at all times (DB_POOL_SIZE)
+- max_overflow=30: Allow up to 30 extra connections during high load (DB_MAX_OVERFLOW)
+- pool_timeout=10: Wait at most 10 seconds for a free connection (DB_POOL_TIMEOUT)
 - pool_pre_ping=True: Test connections before using (prevents "connection closed" errors)
-- pool_recycle=3600: Refresh connections every hour (prevents stale connections)
+- pool_recycle=1800: Replace connections after 30 minutes, before server or
+  firewall idle timeouts drop them (DB_POOL_RECYCLE)
 
 WHY THIS MATTERS:
 - Without pooling: Each request creates a new database connection (slow)
 - With pooling: Connections are reused (fast)
+
+SIZING:
+- The limits apply per worker process, so keep
+  (DB_POOL_SIZE + DB_MAX_OVERFLOW) * workers below Postgres max_connections.
+
+SQLITE (CI, local experiments):
+- Connections are shared across FastAPI's worker threads, so the sqlite3
+  same-thread check is turned off; an in-memory database keeps SQLAlchemy's
+  default single-connection pool, since each new connection would be empty.
 """
 
-import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.pool import QueuePool
+
+from config import settings
 
-load_dotenv()
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+
+def _engine_options(url: str) -> dict:
+    """create_engine() keyword arguments for the given database URL."""
+    options = {
+        "pool_pre_ping": True,                     # Verify connection is alive before using
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # Replace connections after this many seconds
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,        # Number of connections to keep open
+        max_overflow=settings.DB_MAX_OVERFLOW,  # Extra connections allowed during peak load
+        pool_timeout=settings.DB_POOL_TIMEOUT,  # Seconds to wait for a free connection
+    )
+    return options
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Create engine with connection pooling for better performance
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_size=5,           # Number of connections to keep open
-    max_overflow=10,       # Extra connections allowed during peak load
-    pool_pre_ping=True,    # Verify connection is alive before using
-    pool_recycle=3600,     # Recycle connections after 1 hour
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+
+# expire_on_commit=False: objects keep the values they were just written with
+# after a commit, instead of each attribute access re-selecting the row. The
+# primary key and Python-side column defaults are filled in by the flush, so
+# a commit followed by db.refresh() is never needed to return a new object.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -0,0 +1,56 @@
+"""
+Database Schema Initialization for CDRRMO File Manager
+
+Creates the database tables and indexes. Run this once per deploy, before the
+API workers start, instead of letting every worker introspect the schema on
+startup.
+
+WHY THIS FILE EXISTS:
+- Before: main.py called create_all() in every worker's startup, issuing
+  catalog queries on each cold start even when nothing had changed
+- After: schema creation is a one-shot step; workers start without any DDL
+
+USAGE (from the backend directory):
+    python init_db.py
+
+Safe to run repeatedly: existing tables and indexes are left untouched,
+indexes added to an existing table are created, and the ones listed in
+OBSOLETE_INDEXES are dropped.
+"""
+
+from sqlalchemy import text
+
+import database
+import models  # noqa: F401 - registers the tables on Base.metadata
+
+# Indexes earlier versions created that are now covered by others; dropped so
+# writes to file_metadata stop maintaining them
+OBSOLETE_INDEXES = (
+    "ix_file_metadata_folder",  # leading column of ix_file_folder_filename
+    "ix_file_assigned_notnull",  # duplicated the assigned_to_id column index
+)
+
+
+def init_db():
+    """
+    Create missing tables, then any indexes missing from existing tables, and
+    drop the obsolete ones.
+    """
+    metadata = database.Base.metadata
+    metadata.create_all(bind=database.engine)
+
+    # create_all skips tables that already exist, including their new indexes
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=database.engine, checkfirst=True)
+
+    # DROP INDEX IF EXISTS is understood by both SQLite and Postgres
+    with database.engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+if __name__ == "__main__":
+    print("🔄 Creating database tables...")
+    init_db()
+    print("✅ Database tables ready")
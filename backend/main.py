@@ -9,16 +9,16 @@ It configures:
 - Health check endpoint for monitoring
 """
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 import os
+import time
 
-import database
+import init_db
 import routers.users
 import routers.files
 import routers.stats
@@ -27,14 +27,16 @@ import routers.preferences
 import schemas
 import models
 import crud
+import security
 from dependencies import get_db, get_current_user
-
-load_dotenv()
+from config import get_settings
+from middleware import UploadSizeLimitMiddleware
+from responses import OrjsonResponse
 
 # Directory configuration
-BASE_DIR = "CDRRMO files"
+BASE_DIR = get_settings().BASE_DIR
 SUB_DIRS = ["Operation", "Research", "Training"]
-VERSIONS_DIR = "file_versions"
+VERSIONS_DIR = get_settings().VERSIONS_DIR
 
 
 @asynccontextmanager
@@ -43,40 +45,39 @@ async def lifespan(app: FastAPI):
     Application lifespan handler.
     
     Startup:
+    - Validates SECRET_KEY
+    - Warms up password hashing (SECURITY_WARMUP)
     - Creates file storage directories
-    - Creates database tables
+    - Creates database tables when AUTO_CREATE_TABLES is enabled
     
     Shutdown:
-    - (Reserved for cleanup tasks)
+    - Writes any buffered activity log entries
     """
-    # Create base directory for file storage
-    if not os.path.exists(BASE_DIR):
-        os.makedirs(BASE_DIR)
-        print(f"✅ Created base directory: {BASE_DIR}")
-
-    # Create department subdirectories
-    for sub_dir in SUB_DIRS:
-        path = os.path.join(BASE_DIR, sub_dir)
-        if not os.path.exists(path):
-            os.makedirs(path)
-            print(f"✅ Created subdirectory: {path}")
-
-    # Create versions directory for file history
-    if not os.path.exists(VERSIONS_DIR):
-        os.makedirs(VERSIONS_DIR)
-        print(f"✅ Created versions directory: {VERSIONS_DIR}")
-
-    # Create database tables
-    print("🔄 Attempting to create database tables...")
-    try:
-        database.Base.metadata.create_all(bind=database.engine)
-        print("✅ Database tables ready")
-    except Exception as e:
-        print(f"❌ Database error: {e}")
+    # Fail fast on a missing/weak secret before serving any request
+    get_settings().validate_secret_key()
+    if get_settings().SECURITY_WARMUP:
+        security.warm_up_password_hashing()
+
+    # Create the storage tree; makedirs also creates BASE_DIR and is a no-op
+    # for directories that already exist
+    for path in [os.path.join(BASE_DIR, sub_dir) for sub_dir in SUB_DIRS] + [VERSIONS_DIR]:
+        os.makedirs(path, exist_ok=True)
+    print(f"✅ Storage directories ready: {BASE_DIR}")
+
+    # Schema creation normally runs once per deploy via init_db.py; only
+    # development setups opt in to doing it on every startup
+    if get_settings().AUTO_CREATE_TABLES:
+        print("🔄 Attempting to create database tables...")
+        try:
+            init_db.init_db()
+            print("✅ Database tables ready")
+        except Exception as e:
+            print(f"❌ Database error: {e}")
     
     yield
     
-    # Shutdown cleanup (if needed in future)
+    # Shutdown cleanup
+    crud.flush_activity_logs()
     print("👋 Application shutdown")
 
 
@@ -85,12 +86,16 @@ app = FastAPI(
     title="CDRRMO File Manager API",
     description="File management system for the City Disaster Risk Reduction and Management Office",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse,
 )
 
-# Configure CORS
-origins_str = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000,http://127.0.0.1:5173")
-origins = [origin.strip() for origin in origins_str.split(",")]
+# Refuse uploads that declare an oversized body before reading it. Added before
+# CORS so that CORSMiddleware wraps it and the 413 carries CORS headers.
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Configure CORS (origins are parsed once by the cached Settings instance)
+origins = get_settings().CORS_ORIGINS_LIST
 
 app.add_middleware(
     CORSMiddleware,
@@ -107,6 +112,13 @@ print(f"🌐 CORS configured for: {origins}")
 # HEALTH CHECK ENDPOINT
 # =============================================================================
 
+# A successful database check is reused for this many seconds so frequent
+# liveness/readiness probes don't each issue a query. Failures are never cached.
+HEALTH_CHECK_TTL = 5.0
+
+_last_healthy_at = None
+
+
 @app.get("/health", tags=["monitoring"])
 def health_check(db: Session = Depends(get_db)):
     """
@@ -123,15 +135,22 @@ def health_check(db: Session = Depends(get_db)):
     Usage by Docker/Kubernetes:
         HEALTHCHECK CMD curl -f http://localhost:8000/health || exit 1
     """
+    global _last_healthy_at
+    healthy_response = {
+        "status": "healthy",
+        "database": "connected",
+        "version": "1.0.0"
+    }
+    if _last_healthy_at is not None and time.monotonic() - _last_healthy_at < HEALTH_CHECK_TTL:
+        return healthy_response
+
     try:
-        # Test database connection
+        # Test database connection (the session only connects on first use)
         db.execute(text("SELECT 1"))
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "version": "1.0.0"
-        }
+        _last_healthy_at = time.monotonic()
+        return healthy_response
     except Exception as e:
+        _last_healthy_at = None
         raise HTTPException(
             status_code=503,
             detail={
@@ -159,8 +178,8 @@ def read_root():
 
 @app.get("/activity_logs/", response_model=List[schemas.ActivityLog], tags=["logs"])
 def read_activity_logs(
-    skip: int = 0, 
-    limit: int = 100, 
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -0,0 +1,53 @@
+"""
+ASGI Middleware for CDRRMO File Manager
+
+Provides a request-size gate for file uploads.
+
+WHY THIS FILE EXISTS:
+- FastAPI parses the whole multipart body (spooling the file to disk) before
+  the upload endpoint runs, so an oversized upload was only rejected after
+  it had been received in full
+- Clients send Content-Length up front; a request that declares more than
+  MAX_FILE_SIZE can be refused before any of its body is read
+
+The endpoint still enforces MAX_FILE_SIZE while copying the file, which also
+covers chunked requests that carry no Content-Length. The path, limit and 413
+detail come from routers.files, so the two checks can't disagree.
+"""
+
+from typing import Optional
+
+from responses import OrjsonResponse
+from routers.files import FILE_TOO_LARGE_DETAIL, MAX_FILE_SIZE, UPLOAD_PATH
+
+# Room for the multipart boundaries, part headers and the small form fields
+# sent alongside the file
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """Answer 413 to upload requests whose Content-Length exceeds the size limit."""
+
+    def __init__(self, app, path: str = UPLOAD_PATH, max_body_size: Optional[int] = None):
+        self.app = app
+        self.path = path
+        if max_body_size is None:
+            max_body_size = MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == self.path:
+            content_length = None
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    content_length = value
+                    break
+            if content_length is not None and content_length.isdigit() \
+                    and int(content_length) > self.max_body_size:
+                response = OrjsonResponse(
+                    status_code=413,
+                    content={"detail": FILE_TOO_LARGE_DETAIL},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -1,10 +1,18 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, BigInteger
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, BigInteger, DDL, Index, event, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
 from database import Base
 
 
+# The trigram index on file_metadata.filename needs the pg_trgm extension
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -21,10 +29,26 @@ class User(Base):
 
 class FileMetadata(Base):
     __tablename__ = "file_metadata"
+    __table_args__ = (
+        # Folder listings and the upload existence check filter on (folder, filename)
+        Index("ix_file_folder_filename", "folder", "filename"),
+        # Lets filename ILIKE '%q%' searches use an index instead of a seq scan
+        Index(
+            "ix_file_filename_trgm",
+            "filename",
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # Newest-first search pages, overall and within a user's own or
+        # assigned files (keyset pagination on created_at, id)
+        Index("ix_file_created_at_id", "created_at", "id"),
+        Index("ix_file_owner_created_at", "owner_id", "created_at"),
+        Index("ix_file_assigned_created_at", "assigned_to_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True)
-    folder = Column(String, index=True)
+    folder = Column(String)  # indexed by ix_file_folder_filename
     owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     assigned_to_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     instruction = Column(String, nullable=True)
@@ -42,6 +66,10 @@ class FileMetadata(Base):
 class FileVersion(Base):
     """Track file version history"""
     __tablename__ = "file_versions"
+    __table_args__ = (
+        # Next-version lookups (MAX(version_number) per file) and version lists
+        Index("ix_file_version_file_id_ver", "file_id", "version_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     file_id = Column(Integer, ForeignKey("file_metadata.id", ondelete="CASCADE"), index=True)
@@ -59,6 +87,17 @@ class FileVersion(Base):
 class Notification(Base):
     """In-app notifications"""
     __tablename__ = "notifications"
+    __table_args__ = (
+        # A user's newest notifications first
+        Index("ix_notif_user_created", "user_id", "created_at"),
+        # Unread counts and mark-all-as-read only touch unread rows
+        Index(
+            "ix_notif_unread",
+            "user_id",
+            postgresql_where=text("is_read = false"),
+            sqlite_where=text("is_read = 0"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
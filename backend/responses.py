@@ -0,0 +1,69 @@
+"""
+Response Classes for CDRRMO File Manager
+
+Provides the app-wide default JSON response class, rendered with orjson.
+
+WHY THIS FILE EXISTS:
+- Endpoints that return plain dicts (stats, health, file listings) were
+  encoded with the standard json module
+- orjson is a C-accelerated encoder that produces bytes directly
+
+Endpoints with a response_model are still serialized by FastAPI through
+Pydantic straight to JSON bytes; this class covers everything else.
+High-volume list endpoints skip that step and use adapter_response, or
+stream_adapter_response to send large results as they are read.
+"""
+
+from itertools import islice
+from typing import Any, Iterable
+
+import orjson
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
+
+
+class OrjsonResponse(JSONResponse):
+    """JSONResponse that renders its content with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def adapter_response(adapter: TypeAdapter, rows: Iterable[Any]) -> Response:
+    """
+    Validate rows (ORM objects or schema instances) with a prebuilt
+    TypeAdapter and return them as a JSON response.
+
+    Pydantic validates and encodes the rows in a single pass, without the
+    intermediate list of dicts FastAPI builds for a response_model. Routes
+    using this should declare the schema with responses={200: {"model": ...}}
+    so the OpenAPI docs are unchanged.
+    """
+    items = adapter.validate_python(rows, from_attributes=True)
+    return Response(content=adapter.dump_json(items), media_type="application/json")
+
+
+def stream_adapter_response(adapter: TypeAdapter, rows: Iterable[Any], batch_size: int = 50) -> StreamingResponse:
+    """
+    Like adapter_response, but encode and send the JSON array batch_size
+    rows at a time while rows is still being consumed.
+
+    Pair with a query using yield_per(batch_size): only one batch of rows is
+    held in memory, and the client receives the first rows before the last
+    ones are fetched. The iterator runs after the handler has returned, while
+    its dependencies (the database session) are still open.
+    """
+    def body():
+        rows_iter = iter(rows)
+        separator = b"["
+        while True:
+            batch = list(islice(rows_iter, batch_size))
+            if not batch:
+                break
+            items = adapter.validate_python(batch, from_attributes=True)
+            # Drop the enclosing brackets so the batches join into one array
+            yield separator + adapter.dump_json(items)[1:-1]
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+    return StreamingResponse(body(), media_type="application/json")
@@ -1,21 +1,32 @@
+import errno
+import hashlib
 import os
 import shutil
+import stat
+import tempfile
+import threading
 import uuid
-import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Query
+from cachetools import LRUCache, TTLCache
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, Response, UploadFile, Query
 
 from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.orm import Session, joinedload, selectinload
 import zipfile
-import io
 import mimetypes
 
 import crud
 import models
 import schemas
+from config import ALLOWED_EXTENSIONS, settings
+from responses import adapter_response, stream_adapter_response
 from dependencies import get_current_admin_user, get_current_user, get_db
 
 router = APIRouter(
@@ -23,12 +34,306 @@ router = APIRouter(
     tags=["files"],
 )
 
-BASE_DIR = "CDRRMO files"
-VERSIONS_DIR = "file_versions"
-ALLOWED_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".pptx"}
-PREVIEW_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".gif", ".bmp"}
-MAX_FILE_SIZE = 100 * 1024 * 1024  # 100 MB
+BASE_DIR = settings.BASE_DIR
+VERSIONS_DIR = settings.VERSIONS_DIR
+PREVIEW_EXTENSIONS = frozenset({".pdf", ".jpg", ".jpeg", ".png", ".gif", ".bmp"})
+MAX_FILE_SIZE = settings.MAX_FILE_SIZE
 
+# Suffix tuples for extension checks: filename.lower().endswith(suffixes) is a
+# single C-level call, with no splitext path parsing per request
+_ALLOWED_SUFFIXES = tuple(ALLOWED_EXTENSIONS)
+_PREVIEW_SUFFIXES = tuple(PREVIEW_EXTENSIONS)
+
+
+
+@lru_cache(maxsize=8)
+def _abs_base_dir(base_dir: str) -> str:
+    """Absolute form of base_dir, computed once per value (BASE_DIR can be patched)."""
+    return os.path.abspath(base_dir)
+
+
+def _base_path(*parts: str) -> str:
+    """Absolute, normalized path of parts joined under BASE_DIR, without a getcwd() per call."""
+    return os.path.normpath(os.path.join(_abs_base_dir(BASE_DIR), *parts))
+
+
+def _is_within_base_dir(path: str) -> bool:
+    """Whether absolute path is BASE_DIR itself or inside it (not a sibling like 'CDRRMO filesX')."""
+    base = _abs_base_dir(BASE_DIR)
+    return path == base or path.startswith(base + os.sep)
+
+
+def _safe_path(rel: str, *parts: str) -> Optional[str]:
+    """
+    Absolute path of client- or DB-supplied rel (leading/trailing slashes
+    ignored) plus parts under BASE_DIR, or None if it would escape BASE_DIR.
+    """
+    path = _base_path(rel.strip("/\\"), *parts)
+    return path if _is_within_base_dir(path) else None
+
+
+def _resolve(rel: str, *parts: str, detail: str = "Invalid path") -> str:
+    """_safe_path, raising 400 with detail for paths outside BASE_DIR."""
+    path = _safe_path(rel, *parts)
+    if path is None:
+        raise HTTPException(status_code=400, detail=detail)
+    return path
+
+
+_DUMMY_ID_MASK = (1 << 53) - 1  # Stay within JavaScript's safe integer range
+
+
+def dummy_id_for_path(path: str) -> int:
+    """
+    Stable negative ID for listing entries that have no DB row (directories,
+    unindexed files), used as frontend keys. A 64-bit BLAKE2b digest truncated
+    to 53 bits makes collisions negligible even in large trees.
+    """
+    digest = hashlib.blake2b(path.encode(), digest_size=8).digest()
+    return -((int.from_bytes(digest, "big") & _DUMMY_ID_MASK) or 1)
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+UPLOAD_TEMP_PREFIX = ".upload-"  # In-progress uploads; hidden from listings and sync
+
+
+# Shared with middleware.UploadSizeLimitMiddleware, which refuses oversized
+# uploads to UPLOAD_PATH before their body is read
+UPLOAD_ROUTE = "/upload"
+UPLOAD_PATH = router.prefix + UPLOAD_ROUTE
+FILE_TOO_LARGE_DETAIL = f"File too large. Maximum size is {MAX_FILE_SIZE/1024/1024}MB"
+
+
+class FileTooLargeError(Exception):
+    """Raised by save_upload_to_temp when the upload exceeds MAX_FILE_SIZE."""
+
+
+def save_upload_to_temp(src, directory: str):
+    """
+    Copy an uploaded file object into a new temporary file in directory.
+
+    Copies in UPLOAD_CHUNK_SIZE chunks, counting bytes as it goes, and gives up
+    as soon as MAX_FILE_SIZE is exceeded. Returns (temp_path, size); the caller
+    moves the file into place with os.replace. Blocking: run it in a threadpool
+    from async endpoints.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=UPLOAD_TEMP_PREFIX, suffix=".part")
+    size = 0
+    try:
+        # mkstemp creates the file owner-only; match a regular open()
+        os.chmod(temp_path, 0o644)
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise FileTooLargeError()
+                out.write(chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path, size
+
+
+COPY_CHUNK_SIZE = 1024 * 1024  # 1 MiB, for the sendfile and read/write fallbacks
+
+# errnos meaning "this kernel-side copy isn't available here", as opposed to
+# a real I/O error: try the next method instead
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+
+def _copy_fd_range(in_fd: int, out_fd: int) -> bool:
+    """Copy in_fd to out_fd with copy_file_range; False if it is unsupported."""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = False
+    try:
+        while os.copy_file_range(in_fd, out_fd, COPY_CHUNK_SIZE * 64):
+            copied = True
+    except OSError as e:
+        # Only give up before the first byte; a later error is genuine
+        if copied or e.errno not in _COPY_FALLBACK_ERRNOS:
+            raise
+        return False
+    return True
+
+
+def _copy_fd_sendfile(in_fd: int, out_fd: int) -> bool:
+    """Copy in_fd to out_fd with sendfile; False if it is unsupported."""
+    if not hasattr(os, "sendfile"):
+        return False
+    offset = 0
+    try:
+        while True:
+            sent = os.sendfile(out_fd, in_fd, offset, COPY_CHUNK_SIZE)
+            if not sent:
+                return True
+            offset += sent
+    except OSError as e:
+        if offset or e.errno not in _COPY_FALLBACK_ERRNOS:
+            raise
+        return False
+
+
+def _fastcopy(src: str, dst: str):
+    """
+    Copy src to dst (contents, permission bits and timestamps, like
+    shutil.copy2) keeping the data in the kernel where possible.
+
+    Tries copy_file_range first, which can reflink on btrfs/XFS and copy
+    server-side on NFS, then sendfile, then a read/write loop over one
+    reused 1 MiB buffer. Blocking for as long as the copy takes: call it (and
+    link_or_copy / move_file) only from threadpool code such as plain def
+    routes, never from an async endpoint.
+    """
+    in_fd = os.open(src, os.O_RDONLY)
+    try:
+        out_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if not (_copy_fd_range(in_fd, out_fd) or _copy_fd_sendfile(in_fd, out_fd)):
+                buf = bytearray(COPY_CHUNK_SIZE)
+                view = memoryview(buf)
+                with open(in_fd, "rb", buffering=0, closefd=False) as reader:
+                    while True:
+                        n = reader.readinto(buf)
+                        if not n:
+                            break
+                        written = 0
+                        while written < n:
+                            written += os.write(out_fd, view[written:n])
+        finally:
+            os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    shutil.copystat(src, dst)
+
+
+def link_or_copy(src: str, dst: str):
+    """
+    Make dst a hard link to src, falling back to _fastcopy when linking is
+    not possible (different filesystems, unsupported filesystem).
+
+    Used for version snapshots, which are never written to afterwards. Stored
+    files are only ever swapped with os.replace, never rewritten in place, so
+    a file sharing its inode with a version snapshot can't alter it.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        _fastcopy(src, dst)
+
+
+def move_file(src: str, dst: str):
+    """
+    Move file src to dst: a rename when both are on the same filesystem,
+    otherwise _fastcopy followed by removing src.
+    """
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        try:
+            _fastcopy(src, dst)
+        except BaseException:
+            if os.path.exists(dst):
+                os.unlink(dst)
+            raise
+        os.unlink(src)
+
+
+def iter_files(top: str, folder: str = ""):
+    """
+    Yield (folder, DirEntry) for every file below top, recursively.
+
+    folder is the entry's directory relative to top, in the form stored in the
+    DB ("/" for top itself, "A/B" below it); pass folder to name top itself when
+    walking a subtree. Built on os.scandir so callers can use the DirEntry's
+    cached type and stat instead of extra os.path calls. Symlinked directories
+    are not followed; hidden directories (".git", ".Trash-1000", ...) are
+    pruned without being listed, and unreadable directories are skipped.
+    """
+    stack = [(folder, top)]
+    while stack:
+        rel, path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.startswith(UPLOAD_TEMP_PREFIX):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            stack.append((f"{rel}/{entry.name}" if rel else entry.name, entry.path))
+                    elif entry.is_file():
+                        yield rel or "/", entry
+        except OSError:
+            continue
+
+
+# Folder listing cache: absolute directory path -> list of ListedEntry. Rapid
+# navigation between the same folders is served without scandir/stat calls;
+# writes through this API drop the affected entries via
+# invalidate_directory_caches, and changes made directly on disk show up once
+# the TTL expires.
+LISTING_CACHE_TTL = 10  # seconds
+_listing_cache = TTLCache(maxsize=4096, ttl=LISTING_CACHE_TTL)
+_listing_cache_lock = threading.Lock()
+
+ListedEntry = namedtuple("ListedEntry", ["name", "path", "is_dir", "size", "ctime"])
+
+
+def list_directory(path: str) -> List[ListedEntry]:
+    """
+    Return the entries directly inside directory path, with their stat data.
+
+    Served from the listing cache within LISTING_CACHE_TTL. Raises
+    FileNotFoundError / NotADirectoryError like os.scandir. Entries that vanish
+    while being listed and in-progress uploads are left out.
+    """
+    path = os.path.abspath(path)
+    with _listing_cache_lock:
+        entries = _listing_cache.get(path)
+    if entries is not None:
+        return entries
+
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith(UPLOAD_TEMP_PREFIX):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append(ListedEntry(entry.name, entry.path, is_dir, st.st_size, st.st_ctime))
+
+    with _listing_cache_lock:
+        _listing_cache[path] = entries
+    return entries
+
+
+SYNC_WORKERS = 8  # Threads used to walk top-level directories during sync
+
+
+def _find_unknown_files(entries, known_files):
+    """
+    Return (folder, filename, size, ctime) for each (folder, DirEntry) in
+    entries that is not in known_files. Only those new files are stat'ed.
+    """
+    found = []
+    for folder, entry in entries:
+        if (folder, entry.name) in known_files:
+            continue
+        try:
+            st = entry.stat()
+        except OSError as e:
+            print(f"Error syncing file {entry.name}: {e}")
+            continue
+        found.append((folder, entry.name, st.st_size, st.st_ctime))
+    return found
 
 
 @router.post("/sync")
@@ -39,39 +344,43 @@ def sync_files(
     """
     Scans the file system and adds any missing files to the database.
     """
-    added_count = 0
-    
     # Get all known files from DB to avoid duplicates
     # We'll use a set of (folder, filename) tuples for fast lookup
-    db_files = db.query(models.FileMetadata).all()
-    known_files = {(f.folder, f.filename) for f in db_files}
-    
-    for root, dirs, files in os.walk(BASE_DIR):
-        for filename in files:
-            # Calculate relative path (folder)
-            rel_path = os.path.relpath(root, BASE_DIR)
-            folder = "/" if rel_path == "." else rel_path.replace("\\", "/")
-            
-            if (folder, filename) not in known_files:
-                # File exists on disk but not in DB
-                full_path = os.path.join(root, filename)
-                try:
-                    # Create metadata
-                    file_size = os.path.getsize(full_path)
-                    created_at = datetime.fromtimestamp(os.path.getctime(full_path))
-                    
-                    new_file = models.FileMetadata(
-                        filename=filename,
-                        folder=folder,
-                        owner_id=current_user.id, # Assign to admin running the sync
-                        created_at=created_at,
-                        status="Synced"
-                    )
-                    db.add(new_file)
-                    added_count += 1
-                except Exception as e:
-                    print(f"Error syncing file {filename}: {e}")
-                    continue
+    known_files = {
+        (folder, filename)
+        for folder, filename in db.query(models.FileMetadata.folder, models.FileMetadata.filename)
+    }
+    
+    # Files directly in BASE_DIR are checked here; each top-level directory is
+    # walked in its own thread so stat latency (e.g. on network storage) overlaps
+    try:
+        with os.scandir(BASE_DIR) as it:
+            top_entries = [e for e in it if not e.name.startswith(UPLOAD_TEMP_PREFIX)]
+    except OSError:
+        top_entries = []
+    top_dirs = [
+        e for e in top_entries
+        if e.is_dir(follow_symlinks=False) and not e.name.startswith(".")
+    ]
+    
+    found = _find_unknown_files([("/", e) for e in top_entries if e.is_file()], known_files)
+    if top_dirs:
+        with ThreadPoolExecutor(max_workers=min(SYNC_WORKERS, len(top_dirs))) as executor:
+            for subtree_found in executor.map(
+                lambda d: _find_unknown_files(iter_files(d.path, d.name), known_files), top_dirs
+            ):
+                found.extend(subtree_found)
+    
+    for folder, filename, size, ctime in found:
+        db.add(models.FileMetadata(
+            filename=filename,
+            folder=folder,
+            owner_id=current_user.id, # Assign to admin running the sync
+            created_at=datetime.fromtimestamp(ctime),
+            status="Synced",
+            size=size
+        ))
+    added_count = len(found)
     
     if added_count > 0:
         db.commit()
@@ -79,7 +388,7 @@ def sync_files(
     return {"message": f"Sync complete. {added_count} files added.", "added_count": added_count}
 
 
-@router.get("/", response_model=List[schemas.FileMetadata])
+@router.get("/", responses={200: {"model": List[schemas.FileMetadata]}})
 def list_files(
     path: str = Query("/", description="Relative path to list files from"),
     search: Optional[str] = Query(None, description="Search query for filenames"),
@@ -88,19 +397,18 @@ def list_files(
 ):
     if search:
         try:
-            # Global search mode
-            print(f"Searching for: {search}")
+            # Global search mode. Answered from the database alone: the filename
+            # index serves the ILIKE match, and files that only exist on disk are
+            # picked up by /files/sync and by folder listings (auto-sync).
             db_files = crud.search_files(db, search)
-            print(f"Found {len(db_files)} files in DB")
             
             results = []
-            seen_paths = set()
 
             # Process DB files
             for file in db_files:
                 try:
                     # Convert DB model to Pydantic schema
-                    file_data = schemas.FileMetadata.model_validate(file)
+                    file_data = schemas.FileMetadata.model_validate(file, from_attributes=True)
                     
                     # Calculate file path and size
                     # Handle case where folder might be None (though it shouldn't be)
@@ -108,10 +416,9 @@ def list_files(
                     folder_path = "" if folder_str == "/" else folder_str
                     full_path = os.path.join(BASE_DIR, folder_path, file.filename)
                     
-                    if os.path.exists(full_path) and os.path.isfile(full_path):
-                        file_data.size = os.path.getsize(full_path)
-                        seen_paths.add(full_path)
-                    else:
+                    try:
+                        file_data.size = os.stat(full_path).st_size
+                    except OSError:
                         file_data.size = 0
                         
                     results.append(file_data)
@@ -119,43 +426,7 @@ def list_files(
                     print(f"Error processing file {file.id}: {e}")
                     continue
 
-            # Supplement with FS search for unindexed files
-            # Walk through the BASE_DIR to find matching files not in DB
-            for root, dirs, files in os.walk(BASE_DIR):
-                for filename in files:
-                    if search.lower() in filename.lower():
-                        full_path = os.path.join(root, filename)
-                        
-                        # Skip if already added from DB
-                        if full_path in seen_paths:
-                            continue
-                            
-                        # Create dummy metadata for unindexed file
-                        rel_path = os.path.relpath(root, BASE_DIR)
-                        folder = "/" if rel_path == "." else rel_path.replace("\\", "/")
-                        
-                        # Generate negative ID
-                        dummy_id = -abs(zlib.adler32(full_path.encode()))
-                        
-                        try:
-                            file_size = os.path.getsize(full_path)
-                            created_at = datetime.fromtimestamp(os.path.getctime(full_path))
-                            
-                            results.append(schemas.FileMetadata(
-                                id=dummy_id,
-                                filename=filename,
-                                folder=folder,
-                                owner_id=0, # System/Unknown
-                                created_at=created_at,
-                                is_dir=False,
-                                size=file_size,
-                                status="Unindexed"
-                            ))
-                        except Exception as e:
-                            print(f"Error processing FS file {filename}: {e}")
-                            continue
-
-            return results
+            return adapter_response(schemas.FILE_LIST_ADAPTER, results)
         except Exception as e:
             print(f"Search error: {e}")
             raise HTTPException(status_code=500, detail=str(e))
@@ -167,10 +438,14 @@ def list_files(
     
     full_path = os.path.join(BASE_DIR, safe_path)
     
-    if not os.path.exists(full_path):
+    # Also list directories from FS (since we don't track dirs in DB yet explicitly as items).
+    # Repeat listings of the same folder within LISTING_CACHE_TTL reuse the
+    # cached entries and touch the disk only for directory sizes.
+    try:
+        fs_entries = list_directory(full_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Path not found")
-    
-    if not os.path.isdir(full_path):
+    except NotADirectoryError:
         raise HTTPException(status_code=400, detail="Path is not a directory")
 
     # Get files from DB for this folder path
@@ -185,17 +460,16 @@ def list_files(
     # Get all files in this folder from DB
     db_files = crud.get_files_by_folder(db, folder=db_folder_query)
     
-    # Also list directories from FS (since we don't track dirs in DB yet explicitly as items)
-    fs_items = os.listdir(full_path)
-    
     result = []
+    pending = []  # (index in result, path, new row) for files missing from the DB
     
     # Map DB files by filename for easy lookup
     db_file_map = {f.filename: f for f in db_files}
     
-    for item in fs_items:
-        item_path = os.path.join(full_path, item)
-        if os.path.isdir(item_path):
+    for entry in fs_entries:
+        item = entry.name
+        item_path = entry.path
+        if entry.is_dir:
             # It's a directory, create a dummy FileMetadata for it
             # We don't have owner/date for dirs in DB yet, so use defaults or FS stats
             
@@ -204,14 +478,14 @@ def list_files(
             
             # Generate a unique negative ID based on path hash to avoid key collisions in frontend
             # We use negative numbers to distinguish from real DB IDs (which are positive)
-            dummy_id = -abs(zlib.adler32(item_path.encode()))
+            dummy_id = dummy_id_for_path(item_path)
             
             result.append(schemas.FileMetadata(
                 id=dummy_id, 
                 filename=item,
                 folder=db_folder_query,
                 owner_id=0, # System/Unknown
-                created_at=datetime.fromtimestamp(os.path.getctime(item_path)),
+                created_at=datetime.fromtimestamp(entry.ctime),
                 is_dir=True,
                 size=dir_size
             ))
@@ -222,51 +496,54 @@ def list_files(
                 db_file = db_file_map[item]
                 db_file.is_dir = False
                 # Populate size dynamically
-                try:
-                    db_file.size = os.path.getsize(item_path)
-                except OSError:
-                    db_file.size = 0
+                db_file.size = entry.size
                 result.append(db_file)
             else:
                 # File exists in FS but not DB
-                # Automatically sync (add to DB)
-                try:
-                    file_size = os.path.getsize(item_path)
-                    created_at = datetime.fromtimestamp(os.path.getctime(item_path))
-                    
-                    new_file = models.FileMetadata(
-                        filename=item,
-                        folder=db_folder_query,
-                        owner_id=current_user.id, # Assign to current user (likely admin or viewer)
-                        created_at=created_at,
-                        status="Synced",
-                        size=file_size
-                    )
-                    db.add(new_file)
-                    db.commit() # Commit immediately so it has an ID
-                    db.refresh(new_file)
-                    
-                    result.append(new_file)
-                except Exception as e:
-                    print(f"Error auto-syncing file {item}: {e}")
-                    # Fallback to dummy if DB add fails
-                    dummy_id = -abs(zlib.adler32(item_path.encode()))
-                    result.append(schemas.FileMetadata(
-                        id=dummy_id,
-                        filename=item,
-                        folder=db_folder_query,
-                        owner_id=0,
-                        created_at=datetime.fromtimestamp(os.path.getctime(item_path)),
-                        is_dir=False,
-                        size=os.path.getsize(item_path),
-                        status="Unindexed"
-                    ))
-                
-    return result
-
-
-@router.post("/upload", response_model=schemas.FileMetadata)
-async def upload_file(
+                # Automatically sync (add to DB); rows are inserted together below
+                file_size = entry.size
+                created_at = datetime.fromtimestamp(entry.ctime)
+
+                new_file = models.FileMetadata(
+                    filename=item,
+                    folder=db_folder_query,
+                    owner_id=current_user.id, # Assign to current user (likely admin or viewer)
+                    created_at=created_at,
+                    status="Synced",
+                    size=file_size
+                )
+                pending.append((len(result), item_path, new_file))
+                result.append(new_file)
+
+    if pending:
+        # One INSERT batch and one commit for every newly discovered file
+        try:
+            db.add_all([new_file for _, _, new_file in pending])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error auto-syncing {len(pending)} files: {e}")
+            # Fallback to dummies if the DB add fails
+            for index, item_path, new_file in pending:
+                result[index] = schemas.FileMetadata(
+                    id=dummy_id_for_path(item_path),
+                    filename=new_file.filename,
+                    folder=db_folder_query,
+                    owner_id=0,
+                    created_at=new_file.created_at,
+                    is_dir=False,
+                    size=new_file.size,
+                    status="Unindexed"
+                )
+
+    return adapter_response(schemas.FILE_LIST_ADAPTER, result)
+
+
+# Plain def (not async) so FastAPI runs it in the threadpool: copying the
+# upload, the version snapshot (a full copy when hard-linking isn't possible)
+# and the database writes are all blocking and must not stall the event loop
+@router.post(UPLOAD_ROUTE, response_model=schemas.FileMetadata)
+def upload_file(
     folder: str = Form(...),
     file: UploadFile = File(...),
     assigned_to_id: Optional[int] = Form(None),
@@ -281,31 +558,23 @@ async def upload_file(
     if ".." in safe_folder:
         raise HTTPException(status_code=400, detail="Invalid folder path")
         
-    # Ensure folder exists
-    full_folder_path = os.path.join(BASE_DIR, safe_folder)
-    if not os.path.exists(full_folder_path):
-        os.makedirs(full_folder_path, exist_ok=True)
-        
-    file_path = os.path.join(full_folder_path, file.filename)
-    
     # Validate file extension
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
+    if not file.filename.lower().endswith(_ALLOWED_SUFFIXES):
         raise HTTPException(
             status_code=400, 
-            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+            detail=f"File type not allowed. Allowed types: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
         )
 
-    # Validate file size
-    file.file.seek(0, 2)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size is {MAX_FILE_SIZE/1024/1024}MB"
-        )
+    # The parser has already counted the spooled bytes; reject oversized files
+    # before copying anything
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=FILE_TOO_LARGE_DETAIL)
+
+    # Ensure folder exists
+    full_folder_path = os.path.join(BASE_DIR, safe_folder)
+    make_directories(full_folder_path)
+        
+    file_path = os.path.join(full_folder_path, file.filename)
 
     # Check if file exists
     db_folder_query = folder if folder == "/" else safe_folder.replace("\\", "/")
@@ -314,37 +583,41 @@ async def upload_file(
     if os.path.exists(file_path) and not overwrite:
         raise HTTPException(status_code=409, detail="File already exists")
 
-    # If overwriting, save the old version first
-    if existing_file and os.path.exists(file_path) and overwrite:
-        # Get next version number
-        max_version = db.query(models.FileVersion).filter(
-            models.FileVersion.file_id == existing_file.id
-        ).order_by(models.FileVersion.version_number.desc()).first()
-        
-        next_version = (max_version.version_number + 1) if max_version else 1
-        
-        # Save old file to versions directory
-        os.makedirs(VERSIONS_DIR, exist_ok=True)
-        version_filename = f"{existing_file.id}_{next_version}_{uuid.uuid4().hex[:8]}_{file.filename}"
-        version_path = os.path.join(VERSIONS_DIR, version_filename)
+    # Stream the upload into a temporary file next to its destination (size is
+    # enforced while copying); it only replaces the real file further down
+    try:
+        temp_path, file_size = save_upload_to_temp(file.file, full_folder_path)
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail=FILE_TOO_LARGE_DETAIL)
+
+    try:
+        # If overwriting, save the old version first
+        if existing_file and os.path.exists(file_path) and overwrite:
+            # Save old file to versions directory. The name doesn't embed the
+            # version number, which the database assigns on insert
+            os.makedirs(VERSIONS_DIR, exist_ok=True)
+            version_filename = f"{existing_file.id}_{uuid.uuid4().hex}_{file.filename}"
+            version_path = os.path.join(VERSIONS_DIR, version_filename)
         
-        shutil.copy2(file_path, version_path)
+            link_or_copy(file_path, version_path)
         
-        # Create version record
-        old_size = os.path.getsize(file_path)
-        version_record = models.FileVersion(
-            file_id=existing_file.id,
-            version_number=next_version,
-            filename=file.filename,
-            file_path=version_path,
-            size=old_size,
-            created_by_id=current_user.id
-        )
-        db.add(version_record)
+            # Create version record
+            crud.create_file_version(
+                db,
+                file_id=existing_file.id,
+                filename=file.filename,
+                file_path=version_path,
+                size=os.path.getsize(file_path),
+                created_by_id=current_user.id,
+            )
 
-    # Save new file to FS
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+        # Move the new file into place (atomic within the same directory)
+        os.replace(temp_path, file_path)
+        invalidate_directory_caches(full_folder_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
 
     # Parse due_date if provided
     parsed_due_date = None
@@ -363,12 +636,10 @@ async def upload_file(
             instruction=instruction,
             due_date=parsed_due_date
         )
-        db_file = crud.update_file_metadata(db, existing_file.id, update_data)
+        db_file = crud.update_file_metadata(db, existing_file.id, update_data, commit=False)
         
         # Update size
         db_file.size = file_size
-        db.commit()
-        db.refresh(db_file)
         
         action = "OVERWRITE"
     else:
@@ -380,16 +651,15 @@ async def upload_file(
             instruction=instruction,
             due_date=parsed_due_date
         )
-        db_file = crud.create_file_metadata(db=db, file=file_metadata, owner_id=current_user.id)
+        db_file = crud.create_file_metadata(db=db, file=file_metadata, owner_id=current_user.id, commit=False)
         
         # Update size
         db_file.size = file_size
-        db.commit()
-        db.refresh(db_file)
         
         action = "UPLOAD"
     
-    # Create notification for assigned user
+    # Create notification for assigned user. It is linked through the
+    # relationship so a new file's id isn't needed before the flush
     if assigned_to_id and assigned_to_id != current_user.id:
         notification = models.Notification(
             user_id=assigned_to_id,
@@ -397,10 +667,12 @@ async def upload_file(
             message=f"You have been assigned to: {file.filename}",
             type="task_assigned",
             is_urgent=parsed_due_date is not None,
-            related_file_id=db_file.id
+            related_file=db_file
         )
         db.add(notification)
-        db.commit()
+    
+    # Version record, file row and notification go out in one transaction
+    db.commit()
     
     # Log Activity
     crud.create_activity_log(db, schemas.ActivityLogCreate(
@@ -411,9 +683,62 @@ async def upload_file(
     return db_file
 
 
+# Downloads and previews are revalidated on every use ("no-cache") rather than
+# cached for a fixed time, so an overwritten file is never served stale; an
+# unchanged file costs one stat and an empty 304.
+FILE_CACHE_CONTROL = "private, no-cache"
+
+
+def _not_modified(request: Request, etag: str, st: os.stat_result) -> bool:
+    """Whether the request's conditional headers match the file's current version."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/"x" and "x" name the same version
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(st.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional_file_response(
+    request: Request, path: str, not_found_detail: str = "File not found", **kwargs
+) -> Response:
+    """
+    FileResponse for path with ETag / Last-Modified validators, or an empty
+    304 when the client's copy is current.
+
+    The single os.stat here replaces the existence check and is handed to
+    FileResponse, which would otherwise stat the file again. The weak ETag is
+    derived from size and mtime, so it changes whenever the file is replaced.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail=not_found_detail)
+
+    etag = f'W/"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": FILE_CACHE_CONTROL,
+    }
+    if _not_modified(request, etag, st):
+        return Response(status_code=304, headers=headers)
+    headers.update(kwargs.pop("headers", None) or {})
+    return FileResponse(path, stat_result=st, headers=headers, **kwargs)
+
+
 @router.get("/download/{file_id}")
 async def download_file(
     file_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -422,34 +747,26 @@ async def download_file(
         raise HTTPException(status_code=404, detail="File not found")
 
     # Sanitize and validate the file path
-    safe_file_path = os.path.abspath(
-        os.path.join(BASE_DIR, db_file.folder.strip("/\\"), db_file.filename)
-    )
-    if not safe_file_path.startswith(os.path.abspath(BASE_DIR)):
-        raise HTTPException(status_code=400, detail="Invalid file path")
-
-    if not os.path.isfile(safe_file_path):
-        raise HTTPException(status_code=404, detail="File not found")
+    safe_file_path = _resolve(db_file.folder, db_file.filename, detail="Invalid file path")
 
-    return FileResponse(safe_file_path, filename=os.path.basename(safe_file_path))
+    return conditional_file_response(
+        request, safe_file_path, filename=os.path.basename(safe_file_path)
+    )
 
 
 @router.get("/download_path/")
 async def download_file_by_path(
     path: str,
+    request: Request,
     current_user: models.User = Depends(get_current_user),
 ):
     # Sanitize and validate the path
     # Path comes as relative path from BASE_DIR, e.g. "Operations/report.pdf"
-    safe_file_path = os.path.abspath(os.path.join(BASE_DIR, path.strip("/\\")))
-    
-    if not safe_file_path.startswith(os.path.abspath(BASE_DIR)):
-        raise HTTPException(status_code=400, detail="Invalid file path")
+    safe_file_path = _resolve(path, detail="Invalid file path")
 
-    if not os.path.isfile(safe_file_path):
-        raise HTTPException(status_code=404, detail="File not found")
-
-    return FileResponse(safe_file_path, filename=os.path.basename(safe_file_path))
+    return conditional_file_response(
+        request, safe_file_path, filename=os.path.basename(safe_file_path)
+    )
 
 
 @router.delete("/{file_id}")
@@ -465,16 +782,13 @@ async def delete_file(
     if not current_user.is_admin and db_file.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this file")
 
-    # Sanitize and validate the file path
-    safe_file_path = os.path.abspath(
-        os.path.join(BASE_DIR, db_file.folder.strip("/\\"), db_file.filename)
-    )
-    if not safe_file_path.startswith(os.path.abspath(BASE_DIR)):
-        # This case should ideally not be hit if data is clean, but as a safeguard
-        raise HTTPException(status_code=400, detail="Invalid file path")
+    # Sanitize and validate the file path (should ideally not fail if data is
+    # clean, but as a safeguard)
+    safe_file_path = _resolve(db_file.folder, db_file.filename, detail="Invalid file path")
 
     if os.path.exists(safe_file_path):
         os.remove(safe_file_path)
+        invalidate_directory_caches(os.path.dirname(safe_file_path))
 
     crud.delete_file_metadata(db=db, file=db_file)
 
@@ -493,14 +807,12 @@ async def create_directory(
     current_user: models.User = Depends(get_current_admin_user)
 ):
     # Sanitize and validate the path
-    safe_path = os.path.abspath(os.path.join(BASE_DIR, path.strip("/\\")))
-    if not safe_path.startswith(os.path.abspath(BASE_DIR)):
-        raise HTTPException(status_code=400, detail="Invalid path")
+    safe_path = _resolve(path)
 
     if os.path.exists(safe_path):
         raise HTTPException(status_code=400, detail="Directory already exists")
 
-    os.makedirs(safe_path)
+    make_directories(safe_path)
     
     crud.create_activity_log(db, schemas.ActivityLogCreate(
         action="CREATE_DIRECTORY",
@@ -517,27 +829,23 @@ async def delete_directory(
     current_user: models.User = Depends(get_current_admin_user),
 ):
     # Sanitize and validate the path
-    safe_path = os.path.abspath(os.path.join(BASE_DIR, folder_path.strip("/\\")))
-    if not safe_path.startswith(os.path.abspath(BASE_DIR)):
-        raise HTTPException(status_code=400, detail="Invalid path")
+    safe_path = _resolve(folder_path)
 
     if not os.path.isdir(safe_path):
         raise HTTPException(status_code=404, detail="Directory not found")
 
-    # Find all file metadata records within this directory
-    files_to_delete = (
-        db.query(models.FileMetadata)
-        .filter(models.FileMetadata.folder.startswith(folder_path))
-        .all()
-    )
-
-    for file_metadata in files_to_delete:
-        db.delete(file_metadata)
+    # Folders are stored relative to BASE_DIR with "/" separators
+    db_folder = folder_path.strip("/\\").replace("\\", "/")
+    if not db_folder:
+        raise HTTPException(status_code=400, detail="Cannot delete the root directory")
 
-    db.commit()
+    # Delete the metadata of every file within this directory in bulk
+    crud.delete_files_in_folder(db, db_folder)
 
     # Now, delete the directory from the filesystem
     shutil.rmtree(safe_path)
+    invalidate_directory_caches(safe_path, recursive=True)
+    invalidate_directory_caches(os.path.dirname(safe_path))
 
     crud.create_activity_log(db, schemas.ActivityLogCreate(
         action="DELETE_DIRECTORY",
@@ -607,12 +915,24 @@ async def get_assigned_files(
 ):
     return crud.get_files_assigned_to_user(db, user_id=current_user.id)
 
-@router.get("/all_assigned", response_model=List[schemas.FileMetadata])
-async def get_all_assigned_files(
+@router.get("/all_assigned", responses={200: {"model": List[schemas.FileMetadata]}})
+def get_all_assigned_files(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """All assigned files, streamed as a JSON array (Admin only)"""
+    return stream_adapter_response(
+        schemas.FILE_LIST_ADAPTER, crud.get_all_assigned_files(db), crud.ASSIGNED_FILES_BATCH_SIZE
+    )
+
+
+@router.get("/all_assigned/summary", response_model=List[schemas.AssignedFileSummary])
+def get_all_assigned_files_summary(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user),
 ):
-    return crud.get_all_assigned_files(db)
+    """Assigned files as (id, filename, folder, assignee) rows only (Admin only)"""
+    return crud.get_assigned_files_summary(db)
 
 
 @router.post("/batch/delete")
@@ -621,24 +941,22 @@ async def bulk_delete_files(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    deleted_count = 0
-    for file_id in batch.file_ids:
-        db_file = crud.get_file_by_id(db, file_id=file_id)
-        if not db_file:
-            continue
-            
+    db_files = crud.get_files_by_ids(db, batch.file_ids)
+    deletable_ids = []
+    for db_file in db_files.values():
         if not current_user.is_admin and db_file.owner_id != current_user.id:
             continue
 
         # Sanitize and validate the file path
-        safe_file_path = os.path.abspath(
-            os.path.join(BASE_DIR, db_file.folder.strip("/\\"), db_file.filename)
-        )
-        if os.path.exists(safe_file_path) and safe_file_path.startswith(os.path.abspath(BASE_DIR)):
+        safe_file_path = _safe_path(db_file.folder, db_file.filename)
+        if safe_file_path and os.path.exists(safe_file_path):
             os.remove(safe_file_path)
+            invalidate_directory_caches(os.path.dirname(safe_file_path))
+
+        deletable_ids.append(db_file.id)
 
-        crud.delete_file_metadata(db=db, file=db_file)
-        deleted_count += 1
+    crud.delete_files_metadata(db, deletable_ids)
+    deleted_count = len(deletable_ids)
 
     crud.create_activity_log(db, schemas.ActivityLogCreate(
         action="BULK_DELETE",
@@ -648,83 +966,235 @@ async def bulk_delete_files(
     return {"message": f"Successfully deleted {deleted_count} files"}
 
 
+ZIP_STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Formats that are already compressed internally (Office files are zip
+# containers, PDF streams are Flate-encoded); deflating them again costs CPU
+# for almost no size gain, so they are stored as-is
+ZIP_STORED_EXTENSIONS = frozenset({
+    ".pdf", ".docx", ".xlsx", ".pptx",
+    ".jpg", ".jpeg", ".png", ".gif",
+    ".zip", ".gz", ".7z", ".rar",
+})
+_ZIP_STORED_SUFFIXES = tuple(ZIP_STORED_EXTENSIONS)
+
+
+class _ZipStreamBuffer:
+    """
+    Write-only file object that zipfile writes the archive into.
+
+    It has no seek/tell, so zipfile writes data descriptors after each member
+    instead of seeking back to patch headers; the bytes are collected until
+    drained by the streaming generator.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def iter_zip(members):
+    """
+    Build a zip archive of (path, arcname) pairs and yield it in chunks.
+
+    Files are read and compressed incrementally (already-compressed formats
+    are stored), so memory use stays around ZIP_STREAM_CHUNK_SIZE regardless
+    of archive size and the first bytes go out before the last file is read.
+    Files that cannot be opened are skipped.
+    Blocking: pass it to StreamingResponse, which iterates it in a threadpool.
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for path, arcname in members:
+            try:
+                zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                src = open(path, "rb")
+            except OSError:
+                continue
+            zinfo.compress_type = (
+                zipfile.ZIP_STORED
+                if arcname.lower().endswith(_ZIP_STORED_SUFFIXES)
+                else zipfile.ZIP_DEFLATED
+            )
+            with src, zip_file.open(zinfo, "w") as dest:
+                while True:
+                    chunk = src.read(ZIP_STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    if buffer.size >= ZIP_STREAM_CHUNK_SIZE:
+                        yield buffer.drain()
+            if buffer.size >= ZIP_STREAM_CHUNK_SIZE:
+                yield buffer.drain()
+    # Central directory, written when the archive is closed
+    yield buffer.drain()
+
+
 @router.post("/batch/download")
 async def bulk_download_files(
     batch: schemas.BatchFileIds,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    # Create a zip file in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for file_id in batch.file_ids:
-            db_file = crud.get_file_by_id(db, file_id=file_id)
-            if not db_file:
-                continue
-            
-            if not current_user.is_admin and db_file.owner_id != current_user.id:
-                continue
+    # Resolve the files up front; the archive itself is built while streaming
+    db_files = crud.get_files_by_ids(db, batch.file_ids)
+    members = []
+    for file_id in batch.file_ids:
+        db_file = db_files.get(file_id)
+        if not db_file:
+            continue
+        
+        if not current_user.is_admin and db_file.owner_id != current_user.id:
+            continue
 
-            safe_file_path = os.path.abspath(
-                os.path.join(BASE_DIR, db_file.folder.strip("/\\"), db_file.filename)
-            )
-            
-            if os.path.exists(safe_file_path) and safe_file_path.startswith(os.path.abspath(BASE_DIR)):
-                zip_file.write(safe_file_path, db_file.filename)
+        safe_file_path = _safe_path(db_file.folder, db_file.filename)
+        if safe_file_path and os.path.exists(safe_file_path):
+            members.append((safe_file_path, db_file.filename))
 
-    zip_buffer.seek(0)
-    
     return StreamingResponse(
-        zip_buffer,
+        iter_zip(members),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=files.zip"}
     )
 
 
+# Directory size cache: absolute path -> (st_mtime_ns, total size of the files
+# directly inside, child directory paths). A directory's mtime changes whenever
+# entries are added, removed or renamed in it, so a level is only rescanned when
+# it changed; writes that replace file contents in place call
+# invalidate_directory_caches explicitly. It is shared by the request
+# threadpool and the stats fan-out, so every access holds _dir_size_cache_lock
+# (scans run outside it), and it is bounded: entries for directories that were
+# removed or renamed are eventually evicted.
+DIR_SIZE_CACHE_SIZE = 4096  # directories
+_dir_size_cache = LRUCache(maxsize=DIR_SIZE_CACHE_SIZE)
+_dir_size_cache_lock = threading.Lock()
+
+
+def _scan_directory_level(path: str):
+    """Return (size of files directly in path, child directory paths)."""
+    files_size = 0
+    subdirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith(UPLOAD_TEMP_PREFIX):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            # skip if it is symbolic link
+            elif entry.is_file(follow_symlinks=False):
+                files_size += entry.stat(follow_symlinks=False).st_size
+    return files_size, subdirs
+
+
 def get_directory_size(path: str) -> int:
-    """Calculate total size of a directory recursively."""
+    """
+    Calculate total size of a directory recursively.
+
+    Costs one stat per directory when nothing changed; only directories whose
+    mtime moved are listed again.
+    """
     total_size = 0
-    try:
-        for dirpath, dirnames, filenames in os.walk(path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                # skip if it is symbolic link
-                if not os.path.islink(fp):
-                    total_size += os.path.getsize(fp)
-    except Exception:
-        pass # Ignore permission errors etc
+    stack = [os.path.abspath(path)]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            with _dir_size_cache_lock:
+                cached = _dir_size_cache.get(dir_path)
+            if cached is None or cached[0] != mtime_ns:
+                cached = (mtime_ns, *_scan_directory_level(dir_path))
+                with _dir_size_cache_lock:
+                    _dir_size_cache[dir_path] = cached
+        except OSError:
+            continue # Ignore permission errors, concurrently removed dirs etc
+        total_size += cached[1]
+        stack.extend(cached[2])
     return total_size
 
 
+def invalidate_directory_caches(path: str, recursive: bool = False):
+    """
+    Forget the cached size and listing of directory path (and of everything
+    below it if recursive).
+    """
+    path = os.path.abspath(path)
+    with _dir_size_cache_lock:
+        _dir_size_cache.pop(path, None)
+    with _listing_cache_lock:
+        _listing_cache.pop(path, None)
+    if recursive:
+        prefix = path + os.sep
+        with _dir_size_cache_lock:
+            for cached_path in [p for p in list(_dir_size_cache) if p.startswith(prefix)]:
+                _dir_size_cache.pop(cached_path, None)
+        with _listing_cache_lock:
+            for cached_path in [p for p in list(_listing_cache) if p.startswith(prefix)]:
+                _listing_cache.pop(cached_path, None)
+
+
+def make_directories(path: str):
+    """
+    os.makedirs(path, exist_ok=True), also dropping the cached listing of the
+    deepest existing ancestor, which is the one that gains a new folder.
+    """
+    path = os.path.abspath(path)
+    existing = path
+    while not os.path.isdir(existing) and os.path.dirname(existing) != existing:
+        existing = os.path.dirname(existing)
+    os.makedirs(path, exist_ok=True)
+    if existing != path:
+        invalidate_directory_caches(existing)
+
+
+@router.post("/cache/clear")
+def clear_directory_caches(
+    current_user: models.User = Depends(get_current_admin_user),
+):
+    """Drop all cached directory sizes and folder listings (Admin only)"""
+    with _dir_size_cache_lock:
+        cleared = len(_dir_size_cache)
+        _dir_size_cache.clear()
+    with _listing_cache_lock:
+        _listing_cache.clear()
+    return {"message": f"Cleared {cleared} cached directory sizes", "cleared": cleared}
+
+
 @router.get("/download_dir/")
 async def download_directory(
     path: str,
     current_user: models.User = Depends(get_current_user),
 ):
     # Sanitize and validate the path
-    safe_path = os.path.abspath(os.path.join(BASE_DIR, path.strip("/\\")))
-    if not safe_path.startswith(os.path.abspath(BASE_DIR)):
-        raise HTTPException(status_code=400, detail="Invalid path")
+    safe_path = _resolve(path)
 
     if not os.path.isdir(safe_path):
         raise HTTPException(status_code=404, detail="Directory not found")
 
-    # Create a zip file in memory
-    zip_buffer = io.BytesIO()
     folder_name = os.path.basename(safe_path)
-    
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for root, dirs, files in os.walk(safe_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Calculate relative path for zip archive
-                arcname = os.path.relpath(file_path, os.path.dirname(safe_path))
-                zip_file.write(file_path, arcname)
 
-    zip_buffer.seek(0)
+    def members():
+        # Walked lazily, while the archive streams
+        for folder, entry in iter_files(safe_path):
+            # Archive paths are relative to the directory's parent
+            subdir = "" if folder == "/" else f"{folder}/"
+            yield entry.path, f"{folder_name}/{subdir}{entry.name}"
     
     return StreamingResponse(
-        zip_buffer,
+        iter_zip(members()),
         media_type="application/zip",
         headers={"Content-Disposition": f"attachment; filename={folder_name}.zip"}
     )
@@ -735,6 +1205,7 @@ async def download_directory(
 @router.get("/{file_id}/preview")
 def get_file_preview(
     file_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -750,21 +1221,21 @@ def get_file_preview(
     if not current_user.is_admin and file.owner_id != current_user.id and file.assigned_to_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to preview this file")
     
-    ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in PREVIEW_EXTENSIONS:
+    if not file.filename.lower().endswith(_PREVIEW_SUFFIXES):
+        ext = os.path.splitext(file.filename)[1].lower()
         raise HTTPException(status_code=400, detail=f"Preview not supported for {ext} files. Only PDF and images are supported.")
     
     file_path = os.path.join(BASE_DIR, file.folder.strip("/\\"), file.filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
     
     # Determine content type
     content_type, _ = mimetypes.guess_type(file_path)
     if not content_type:
         content_type = "application/octet-stream"
     
-    return FileResponse(
+    return conditional_file_response(
+        request,
         file_path,
+        not_found_detail="File not found on disk",
         media_type=content_type,
         headers={"Content-Disposition": f"inline; filename={file.filename}"}
     )
@@ -838,33 +1309,36 @@ def restore_file_version(
     
     # First, save current file as a new version (so restore can be undone)
     if os.path.exists(current_file_path):
-        # Get next version number
-        max_version = db.query(models.FileVersion).filter(
-            models.FileVersion.file_id == file_id
-        ).order_by(models.FileVersion.version_number.desc()).first()
-        
-        next_version = (max_version.version_number + 1) if max_version else 1
-        
-        # Save current file to versions
-        version_filename = f"{file_id}_{next_version}_{uuid.uuid4().hex[:8]}_{file.filename}"
+        # Save current file to versions (numbered by the database on insert)
+        version_filename = f"{file_id}_{uuid.uuid4().hex}_{file.filename}"
         version_path = os.path.join(VERSIONS_DIR, version_filename)
         
         os.makedirs(VERSIONS_DIR, exist_ok=True)
-        shutil.copy2(current_file_path, version_path)
+        link_or_copy(current_file_path, version_path)
         
         # Create version record for current file
-        new_version = models.FileVersion(
+        crud.create_file_version(
+            db,
             file_id=file_id,
-            version_number=next_version,
             filename=file.filename,
             file_path=version_path,
             size=os.path.getsize(version_path),
-            created_by_id=current_user.id
+            created_by_id=current_user.id,
         )
-        db.add(new_version)
     
-    # Now restore the selected version
-    shutil.copy2(version.file_path, current_file_path)
+    # Now restore the selected version. Swap it in with os.replace rather than
+    # copying over the current file: that inode may be shared with a version.
+    temp_path = os.path.join(
+        os.path.dirname(current_file_path), f"{UPLOAD_TEMP_PREFIX}{uuid.uuid4().hex}.part"
+    )
+    try:
+        link_or_copy(version.file_path, temp_path)
+        os.replace(temp_path, current_file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    invalidate_directory_caches(os.path.dirname(current_file_path))
     
     # Update file metadata
     file.size = os.path.getsize(current_file_path)
@@ -888,7 +1362,11 @@ def restore_file_version(
 
 # ==================== ADVANCED SEARCH ====================
 
-@router.get("/search/advanced", response_model=List[schemas.FileMetadata])
+# Rows fetched, serialized and sent per step of an advanced search response
+SEARCH_STREAM_BATCH_SIZE = 50
+
+
+@router.get("/search/advanced", responses={200: {"model": List[schemas.FileMetadata]}})
 def advanced_search(
     q: Optional[str] = Query(None, description="Search query for filename"),
     folder: Optional[str] = Query(None, description="Filter by folder"),
@@ -900,8 +1378,10 @@ def advanced_search(
     assigned_to_id: Optional[int] = Query(None, description="Filter by assigned user ID"),
     has_due_date: Optional[bool] = Query(None, description="Filter files with/without due dates"),
     overdue_only: Optional[bool] = Query(False, description="Show only overdue files"),
-    skip: int = 0,
-    limit: int = 100,
+    after_created_at: Optional[datetime] = Query(None, description="Keyset cursor: created_at of the last file on the previous page"),
+    after_id: Optional[int] = Query(None, description="Keyset cursor: id of the last file on the previous page"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -909,8 +1389,15 @@ def advanced_search(
     Advanced search with multiple filters.
     Regular users can only see their own files and files assigned to them.
     Admins can see all files.
+
+    Results are newest first. To page, pass the created_at and id of the
+    last file received as after_created_at / after_id: unlike skip, the cost
+    of a page doesn't grow with how deep it is.
     """
-    query = db.query(models.FileMetadata)
+    query = db.query(models.FileMetadata).options(
+        selectinload(models.FileMetadata.owner),
+        selectinload(models.FileMetadata.assigned_to),
+    )
     
     # Permission filter
     if not current_user.is_admin:
@@ -921,7 +1408,7 @@ def advanced_search(
     
     # Apply filters
     if q:
-        query = query.filter(models.FileMetadata.filename.ilike(f"%{q}%"))
+        query = query.filter(models.FileMetadata.filename.ilike(crud.contains_pattern(q), escape=crud.LIKE_ESCAPE))
     
     if folder:
         query = query.filter(models.FileMetadata.folder == folder)
@@ -959,7 +1446,20 @@ def advanced_search(
             models.FileMetadata.status != "Done"
         )
     
-    return query.order_by(models.FileMetadata.created_at.desc()).offset(skip).limit(limit).all()
+    if after_created_at is not None and after_id is not None:
+        query = query.filter(
+            tuple_(models.FileMetadata.created_at, models.FileMetadata.id) < (after_created_at, after_id)
+        )
+    
+    # Read through a server-side cursor and sent batch by batch; selectinload
+    # fetches the owners and assignees once per batch
+    rows = (
+        query.order_by(models.FileMetadata.created_at.desc(), models.FileMetadata.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .yield_per(SEARCH_STREAM_BATCH_SIZE)
+    )
+    return stream_adapter_response(schemas.FILE_LIST_ADAPTER, rows, SEARCH_STREAM_BATCH_SIZE)
 
 
 # ==================== BULK OPERATIONS ====================
@@ -970,46 +1470,51 @@ def bulk_assign_files(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user),
 ):
-    """Assign multiple files to a user (Admin only)"""
-    # Verify target user exists
-    target_user = db.query(models.User).filter(models.User.id == batch.assigned_to_id).first()
-    if not target_user:
+    """
+    Assign multiple files to a user (Admin only)
+
+    The number of statements doesn't grow with the batch: the target user's
+    name, one UPDATE ... RETURNING that also yields the filenames for the
+    notifications, one multi-row INSERT of those, and the log entry.
+    """
+    # Verify target user exists; only the name is needed
+    target_username = db.scalar(
+        select(models.User.username).where(models.User.id == batch.assigned_to_id)
+    )
+    if target_username is None:
         raise HTTPException(status_code=404, detail="Target user not found")
     
-    updated_count = 0
-    for file_id in batch.file_ids:
-        file = crud.get_file_by_id(db, file_id)
-        if file and not file.is_dir:
-            file.assigned_to_id = batch.assigned_to_id
-            if batch.instruction:
-                file.instruction = batch.instruction
-            if batch.due_date:
-                file.due_date = batch.due_date
-            file.status = "Pending"
-            updated_count += 1
-            
-            # Create notification for the assigned user
-            notification = models.Notification(
-                user_id=batch.assigned_to_id,
-                title="New Task Assigned",
-                message=f"You have been assigned to: {file.filename}",
-                type="task_assigned",
-                is_urgent=batch.due_date is not None,
-                related_file_id=file_id
-            )
-            db.add(notification)
+    assigned = crud.assign_files(
+        db, batch.file_ids, batch.assigned_to_id,
+        instruction=batch.instruction, due_date=batch.due_date,
+    )
+    updated_count = len(assigned)
+    
+    # Create notifications for the assigned user, in one multi-row INSERT
+    if assigned:
+        db.execute(insert(models.Notification), [
+            {
+                "user_id": batch.assigned_to_id,
+                "title": "New Task Assigned",
+                "message": f"You have been assigned to: {filename}",
+                "type": "task_assigned",
+                "is_urgent": batch.due_date is not None,
+                "related_file_id": file_id,
+            }
+            for file_id, filename in assigned
+        ])
     
     # Log the action
     log = models.ActivityLog(
         user_id=current_user.id,
         action="BULK_ASSIGN",
-        details=f"Assigned {updated_count} files to user {target_user.username}"
+        details=f"Assigned {updated_count} files to user {target_username}"
     )
     db.add(log)
     
     db.commit()
     
-    return {"message": f"Assigned {updated_count} files to {target_user.username}"}
+    return {"message": f"Assigned {updated_count} files to {target_username}"}
 
 
 @router.post("/batch/move")
@@ -1021,14 +1526,15 @@ def bulk_move_files(
     """Move multiple files to a different folder"""
     # Validate destination folder exists
     dest_path = os.path.join(BASE_DIR, batch.destination_folder.strip("/\\"))
-    if not os.path.exists(dest_path):
-        os.makedirs(dest_path, exist_ok=True)
+    make_directories(dest_path)
     
-    moved_count = 0
+    moved_ids = []
+    source_dirs = set()
     errors = []
     
+    files_by_id = crud.get_files_by_ids(db, batch.file_ids)
     for file_id in batch.file_ids:
-        file = crud.get_file_by_id(db, file_id)
+        file = files_by_id.get(file_id)
         if not file:
             continue
         
@@ -1050,12 +1556,19 @@ def bulk_move_files(
             continue
         
         try:
-            shutil.move(current_path, new_path)
-            file.folder = batch.destination_folder
-            moved_count += 1
+            move_file(current_path, new_path)
+            source_dirs.add(os.path.dirname(current_path))
+            moved_ids.append(file.id)
         except Exception as e:
             errors.append(f"Failed to move {file.filename}: {str(e)}")
     
+    for source_dir in source_dirs:
+        invalidate_directory_caches(source_dir)
+    if moved_ids:
+        invalidate_directory_caches(dest_path)
+    crud.move_files_metadata(db, moved_ids, batch.destination_folder)
+    moved_count = len(moved_ids)
+    
     # Log the action
     log = models.ActivityLog(
         user_id=current_user.id,
@@ -1082,7 +1595,11 @@ def get_file_details(
     current_user: models.User = Depends(get_current_user),
 ):
     """Get detailed information about a file including version count"""
-    file = crud.get_file_by_id(db, file_id)
+    file = db.get(
+        models.FileMetadata,
+        file_id,
+        options=[joinedload(models.FileMetadata.owner), joinedload(models.FileMetadata.assigned_to)],
+    )
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
     
@@ -1097,9 +1614,12 @@ def get_file_details(
     
     # Get file path for size
     file_path = os.path.join(BASE_DIR, file.folder.strip("/\\"), file.filename)
-    file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    try:
+        file_size = os.stat(file_path).st_size
+    except OSError:
+        file_size = 0
     
-    # Check if preview is available
+    # Check if preview is available (ext is reused for file_type below)
     ext = os.path.splitext(file.filename)[1].lower()
     can_preview = ext in PREVIEW_EXTENSIONS
     
@@ -1,42 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import List
 
 from dependencies import get_db, get_current_user
 import models
 import schemas
+from responses import adapter_response
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 
-def create_notification(
-    db: Session,
-    user_id: int,
-    title: str,
-    message: str,
-    notification_type: str,
-    is_urgent: bool = False,
-    related_file_id: int = None
-):
-    """Helper function to create notifications"""
-    notification = models.Notification(
-        user_id=user_id,
-        title=title,
-        message=message,
-        type=notification_type,
-        is_urgent=is_urgent,
-        related_file_id=related_file_id
-    )
-    db.add(notification)
-    db.commit()
-    db.refresh(notification)
-    return notification
-
-
-@router.get("/", response_model=List[schemas.Notification])
+@router.get("/", responses={200: {"model": List[schemas.Notification]}})
 def get_notifications(
-    skip: int = 0,
-    limit: int = 50,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
     unread_only: bool = False,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
@@ -49,7 +27,33 @@ def get_notifications(
     if unread_only:
         query = query.filter(models.Notification.is_read == False)
     
-    return query.order_by(models.Notification.created_at.desc()).offset(skip).limit(limit).all()
+    rows = query.order_by(models.Notification.created_at.desc()).offset(skip).limit(limit).all()
+    return adapter_response(schemas.NOTIFICATION_LIST_ADAPTER, rows)
+
+
+@router.get("/summary", response_model=schemas.NotificationSummary)
+def get_notification_summary(
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Get current user's latest notifications together with their unread count.
+
+    One query: the count is a window aggregate over all of the user's
+    notifications, evaluated before LIMIT, and repeated on each row.
+    """
+    unread = func.count().filter(models.Notification.is_read == False).over()
+    rows = db.execute(
+        select(models.Notification, unread)
+        .where(models.Notification.user_id == current_user.id)
+        .order_by(models.Notification.created_at.desc())
+        .limit(limit)
+    ).all()
+    return {
+        "items": [notification for notification, _ in rows],
+        "unread": rows[0][1] if rows else 0,
+    }
 
 
 @router.get("/unread-count")
@@ -72,15 +76,15 @@ def mark_as_read(
     current_user: models.User = Depends(get_current_user)
 ):
     """Mark a notification as read"""
-    notification = db.query(models.Notification).filter(
+    # One UPDATE; no matched row means it doesn't exist or isn't the user's
+    updated = db.query(models.Notification).filter(
         models.Notification.id == notification_id,
         models.Notification.user_id == current_user.id
-    ).first()
+    ).update({"is_read": True}, synchronize_session=False)
     
-    if not notification:
+    if not updated:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.is_read = True
     db.commit()
     return {"message": "Notification marked as read"}
 
@@ -106,15 +110,14 @@ def delete_notification(
     current_user: models.User = Depends(get_current_user)
 ):
     """Delete a notification"""
-    notification = db.query(models.Notification).filter(
+    deleted = db.query(models.Notification).filter(
         models.Notification.id == notification_id,
         models.Notification.user_id == current_user.id
-    ).first()
+    ).delete(synchronize_session=False)
     
-    if not notification:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    db.delete(notification)
     db.commit()
     return {"message": "Notification deleted"}
 
@@ -23,7 +23,6 @@ def get_preferences(
         prefs = models.UserPreferences(user_id=current_user.id)
         db.add(prefs)
         db.commit()
-        db.refresh(prefs)
     
     return prefs
 
@@ -48,5 +47,4 @@ def update_preferences(
         setattr(prefs, key, value)
     
     db.commit()
-    db.refresh(prefs)
     return prefs
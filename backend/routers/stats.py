@@ -2,33 +2,67 @@
 Statistics router for admin dashboard
 """
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import and_, case, func
+import crud
 import models
+from config import settings
 from dependencies import get_current_admin_user, get_db
+from routers.files import get_directory_size
 
 router = APIRouter(
     prefix="/stats",
     tags=["statistics"],
 )
 
-BASE_DIR = "CDRRMO files"
+BASE_DIR = settings.BASE_DIR
+
+# Top-level folders whose storage use the dashboard reports
+STORAGE_FOLDERS = ("Operation", "Research", "Training")
 
 
 def get_folder_size(folder_path: str) -> int:
-    """Calculate total size of a folder recursively"""
-    total_size = 0
-    try:
-        for dirpath, dirnames, filenames in os.walk(folder_path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if os.path.exists(fp):
-                    total_size += os.path.getsize(fp)
-    except Exception:
-        pass
-    return total_size
+    """
+    Calculate total size of a folder recursively.
+
+    Shares the file manager's directory size cache: a dashboard load costs one
+    stat per directory, and only directories that changed are listed again.
+    """
+    return get_directory_size(folder_path)
+
+
+# Upper-cased text after the last "." of a filename, or 'OTHER' without one
+# (what filename.split('.')[-1].upper() gives). Built from functions that
+# SQLite and Postgres share: rtrim() strips every trailing non-dot character,
+# leaving the name up to its last dot, and the extension is what follows it.
+_filename = models.FileMetadata.filename
+FILE_EXTENSION = case(
+    (
+        _filename.like("%.%"),
+        func.upper(
+            func.substr(_filename, func.length(func.rtrim(_filename, func.replace(_filename, ".", ""))) + 1)
+        ),
+    ),
+    else_="OTHER",
+)
+
+
+def _count_where(*conditions):
+    """COUNT of the rows matching all conditions, for use next to other aggregates."""
+    return func.count(case((and_(*conditions), 1)))
+
+
+# Per-folder file counts, built once and labelled with the folder name. The
+# counts come out of the one aggregate pass over file_metadata below, which
+# reads every row anyway, so a separate indexed folder-root column wouldn't
+# make them cheaper.
+FOLDER_FILE_COUNTS = [
+    _count_where(models.FileMetadata.folder.like(f"{folder}%")).label(folder)
+    for folder in STORAGE_FOLDERS
+]
 
 
 @router.get("/dashboard")
@@ -42,61 +76,37 @@ def get_dashboard_stats(
     # Total users
     total_users = db.query(func.count(models.User.id)).scalar()
     
-    # Total files
-    total_files = db.query(func.count(models.FileMetadata.id)).scalar()
-    
-    # Files by folder
-    operation_files = db.query(func.count(models.FileMetadata.id)).filter(
-        models.FileMetadata.folder.like('Operation%')
-    ).scalar()
-    
-    research_files = db.query(func.count(models.FileMetadata.id)).filter(
-        models.FileMetadata.folder.like('Research%')
-    ).scalar()
-    
-    training_files = db.query(func.count(models.FileMetadata.id)).filter(
-        models.FileMetadata.folder.like('Training%')
-    ).scalar()
+    # File and task counts, all from a single pass over file_metadata
+    now = datetime.now(timezone.utc)
+    File = models.FileMetadata
+    assigned = File.assigned_to_id.isnot(None)
+    counts = db.query(
+        func.count(File.id).label("total_files"),
+        *FOLDER_FILE_COUNTS,
+        # Task completion metrics
+        _count_where(assigned).label("total_assigned"),
+        _count_where(assigned, File.status == "Done").label("completed_tasks"),
+        _count_where(assigned, File.status == "Pending").label("pending_tasks"),
+        # Overdue tasks
+        _count_where(File.due_date.isnot(None), File.due_date < now, File.status != "Done").label("overdue_tasks"),
+    ).one()
     
     # Storage usage by folder
-    storage = {
-        "Operation": get_folder_size(os.path.join(BASE_DIR, "Operation")),
-        "Research": get_folder_size(os.path.join(BASE_DIR, "Research")),
-        "Training": get_folder_size(os.path.join(BASE_DIR, "Training")),
-    }
+    # The walks are independent and I/O-bound, so they run side by side
+    with ThreadPoolExecutor(max_workers=len(STORAGE_FOLDERS)) as executor:
+        sizes = executor.map(
+            get_folder_size, [os.path.join(BASE_DIR, folder) for folder in STORAGE_FOLDERS]
+        )
+        storage = dict(zip(STORAGE_FOLDERS, sizes))
     storage["total"] = sum(storage.values())
     
-    # Task completion metrics
-    total_assigned = db.query(func.count(models.FileMetadata.id)).filter(
-        models.FileMetadata.assigned_to_id.isnot(None)
-    ).scalar()
-    
-    completed_tasks = db.query(func.count(models.FileMetadata.id)).filter(
-        models.FileMetadata.assigned_to_id.isnot(None),
-        models.FileMetadata.status == "Done"
-    ).scalar()
-    
-    pending_tasks = db.query(func.count(models.FileMetadata.id)).filter(
-        models.FileMetadata.assigned_to_id.isnot(None),
-        models.FileMetadata.status == "Pending"
-    ).scalar()
-    
-    # Overdue tasks
-    now = datetime.now(timezone.utc)
-    overdue_tasks = db.query(func.count(models.FileMetadata.id)).filter(
-        models.FileMetadata.due_date.isnot(None),
-        models.FileMetadata.due_date < now,
-        models.FileMetadata.status != "Done"
-    ).scalar()
-    
-    # File type distribution
-    file_types = {}
-    all_files = db.query(models.FileMetadata.filename).all()
-    for (filename,) in all_files:
-        ext = filename.split('.')[-1].upper() if '.' in filename else 'OTHER'
-        file_types[ext] = file_types.get(ext, 0) + 1
+    # File type distribution, counted by the database (one row per extension)
+    file_types = dict(
+        db.query(FILE_EXTENSION, func.count(models.FileMetadata.id)).group_by(FILE_EXTENSION).all()
+    )
     
     # Recent activity logs (last 10)
+    crud.flush_activity_logs()
     recent_activities = db.query(models.ActivityLog).order_by(
         models.ActivityLog.timestamp.desc()
     ).limit(10).all()
@@ -126,19 +136,15 @@ def get_dashboard_stats(
     
     return {
         "total_users": total_users,
-        "total_files": total_files,
-        "folder_distribution": {
-            "Operation": operation_files,
-            "Research": research_files,
-            "Training": training_files
-        },
+        "total_files": counts.total_files,
+        "folder_distribution": {folder: counts._mapping[folder] for folder in STORAGE_FOLDERS},
         "storage": storage,
         "task_metrics": {
-            "total_assigned": total_assigned,
-            "completed": completed_tasks,
-            "pending": pending_tasks,
-            "overdue": overdue_tasks,
-            "completion_rate": round((completed_tasks / total_assigned * 100) if total_assigned > 0 else 0, 1)
+            "total_assigned": counts.total_assigned,
+            "completed": counts.completed_tasks,
+            "pending": counts.pending_tasks,
+            "overdue": counts.overdue_tasks,
+            "completion_rate": round((counts.completed_tasks / counts.total_assigned * 100) if counts.total_assigned > 0 else 0, 1)
         },
         "file_types": file_types,
         "recent_activities": activity_logs,
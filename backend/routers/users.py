@@ -1,8 +1,9 @@
 from datetime import timedelta
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 import crud
@@ -19,6 +20,7 @@ router = APIRouter(
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 
+# Runs in the threadpool (plain def), which keeps password hashing off the event loop
 @router.post("/", response_model=schemas.User)
 def create_user(
     user: schemas.UserCreate,
@@ -28,33 +30,43 @@ def create_user(
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    # Check if this is the first user
-    user_count = db.query(models.User).count()
-    if user_count == 0:
-        user.is_admin = True
-    else:
-        user.is_admin = False
+    # The first user becomes admin. EXISTS stops at the first row instead of
+    # counting the whole table.
+    user.is_admin = not db.query(db.query(models.User).exists()).scalar()
         
     return crud.create_user(db=db, user=user)
 
 
 @router.get("/count", response_model=dict)
 def get_user_count(db: Session = Depends(get_db)):
-    count = db.query(models.User).count()
+    # Kept exact (not a pg_class estimate): the frontend offers admin setup
+    # only while this is 0. A plain COUNT avoids the subquery Query.count() adds.
+    count = db.query(func.count(models.User.id)).scalar()
     return {"count": count}
 
 
+# Plain def (not async) so FastAPI runs it in the threadpool: the password
+# hash check is deliberately slow and must not block the event loop. Argon2id
+# (argon2-cffi) releases the GIL, so concurrent logins already use all cores
+# without a process pool, but each check holds about 46 MiB for one pass
+# (t=1): size the threadpool against memory as well as cores. Legacy PBKDF2
+# hashes are verified once and re-hashed. Repeat logins within
+# security.VERIFY_CACHE_TTL skip the check.
 @router.post("/token")
-async def login_for_access_token(
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user or not security.verify_password_cached(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Upgrade hashes from before the switch to Argon2id while the plain
+    # password is at hand
+    if security.password_needs_rehash(user.hashed_password):
+        crud.update_password_hash(db, user.id, security.get_password_hash(form_data.password))
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -81,8 +93,8 @@ def get_current_user_details(
 
 @router.get("/", response_model=List[schemas.User])
 def read_users(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
     search: str = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user),
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import List, Optional
 from datetime import datetime
 
@@ -39,6 +39,16 @@ class FileMetadata(FileMetadataBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class AssignedFileSummary(BaseModel):
+    """Projection used by assigned-file list views."""
+    id: int
+    filename: str
+    folder: str
+    assigned_to: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 # File Version Schemas
 class FileVersionBase(BaseModel):
     version_number: int
@@ -80,6 +90,12 @@ class Notification(NotificationBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class NotificationSummary(BaseModel):
+    """Latest notifications plus the user's total unread count, in one response."""
+    items: List[Notification]
+    unread: int
+
+
 class NotificationUpdate(BaseModel):
     is_read: Optional[bool] = None
 
@@ -186,3 +202,10 @@ class BatchMove(BaseModel):
     file_ids: List[int]
     destination_folder: str
 
+
+
+# Module-level adapters for list endpoints that serialize their rows
+# directly (see responses.adapter_response and stream_adapter_response);
+# built once, not per request.
+FILE_LIST_ADAPTER = TypeAdapter(List[FileMetadata])
+NOTIFICATION_LIST_ADAPTER = TypeAdapter(List[Notification])
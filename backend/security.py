@@ -7,43 +7,61 @@ This module handles:
 - Security configuration
 
 SECURITY NOTES:
-- Uses PBKDF2-SHA256 for password hashing (industry standard)
+- Uses Argon2id (argon2-cffi) for password hashing; older PBKDF2-SHA256
+  hashes still verify and are replaced with Argon2id on the next login
+- Hashing and verification are synchronous and CPU-bound (Argon2 releases
+  the GIL): call them from plain `def` routes, which FastAPI runs in its
+  threadpool, never directly from an `async def` route
+- Successful password checks are remembered for VERIFY_CACHE_TTL seconds
+  (failures never are, so guessing still pays the full hash cost)
 - JWT tokens expire after 30 minutes by default
-- SECRET_KEY must be at least 32 characters
+- Decoded tokens are cached until their own expiry; tokens that fail to
+  decode are never cached
+- SECRET_KEY must be at least 32 characters (checked on application startup)
 """
 
-import os
-from datetime import datetime, timedelta, timezone
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import timedelta
 from typing import Optional
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+import jwt
+import orjson
+from cachetools import TTLCache
 
-import schemas
+from config import settings
 
-# Load and validate SECRET_KEY
-SECRET_KEY = os.getenv("SECRET_KEY", "")
+# SECRET_KEY is validated once during application startup (see
+# Settings.validate_secret_key, called from main.lifespan) rather than at
+# import time, so scripts that merely import this module don't pay for it.
+SECRET_KEY = settings.SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-# Validate SECRET_KEY on module load
-if not SECRET_KEY:
-    raise ValueError(
-        "❌ SECRET_KEY environment variable is required!\n"
-        "   Generate one with: openssl rand -hex 32\n"
-        "   Then add to your .env file: SECRET_KEY=your_generated_key"
-    )
+# Argon2id hasher, called directly rather than through passlib's CryptContext
+# so each login is one native call. Memory-hard hashing is deliberately
+# expensive for attackers; 46 MiB with one pass is the OWASP-recommended
+# setting and costs the server less time per login than the PBKDF2 rounds
+# it replaced. Hashes stored before the switch (PBKDF2-SHA256) are still
+# verified, through passlib, which is only imported when one is seen.
+ARGON2_PREFIX = "$argon2"
+_password_hasher = PasswordHasher(time_cost=1, memory_cost=46 * 1024, parallelism=1)
 
-if len(SECRET_KEY) < 32:
-    raise ValueError(
-        f"❌ SECRET_KEY must be at least 32 characters (currently {len(SECRET_KEY)}).\n"
-        "   Generate a secure key with: openssl rand -hex 32"
-    )
 
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+def _verify_legacy_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a pre-Argon2 PBKDF2-SHA256 hash, calling passlib's handler
+    directly: no CryptContext scheme identification or deprecation checks.
+    """
+    from passlib.hash import pbkdf2_sha256
 
-# Password hashing context using PBKDF2-SHA256
-# This is computationally expensive (good for security - slows down brute force attacks)
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+    return pbkdf2_sha256.verify(plain_password, hashed_password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -57,7 +75,57 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    if not hashed_password.startswith(ARGON2_PREFIX):
+        return _verify_legacy_password(plain_password, hashed_password)
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+# Successful verifications, keyed by the stored hash and a keyed digest of the
+# password, so repeat logins within the TTL skip the hash. The
+# process-local random key keeps the cached digests from being usable as
+# fast-to-test password hashes, and keying on the stored hash means a
+# password change invalidates the entry. Keyed BLAKE2b is a MAC in a single
+# pass, where HMAC-SHA256 needs two.
+VERIFY_CACHE_TTL = 60
+_verify_cache_key = secrets.token_bytes(32)
+_verify_cache = TTLCache(maxsize=2048, ttl=VERIFY_CACHE_TTL)
+_verify_cache_lock = threading.Lock()
+
+
+def verify_password_cached(plain_password: str, hashed_password: str) -> bool:
+    """verify_password, answering repeats of a recent successful check from memory."""
+    digest = hashlib.blake2b(plain_password.encode(), digest_size=16, key=_verify_cache_key).digest()
+    key = (hashed_password, digest)
+    with _verify_cache_lock:
+        if key in _verify_cache:
+            return True
+    if not verify_password(plain_password, hashed_password):
+        return False
+    with _verify_cache_lock:
+        _verify_cache[key] = True
+    return True
+
+
+def warm_up_password_hashing() -> None:
+    """
+    Hash a throwaway password once, so the first real login in this process
+    doesn't also pay for first-use costs (the Argon2 memory allocation and
+    faulting in its pages).
+    """
+    _password_hasher.hash("warmup")
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Whether a stored hash uses a deprecated scheme or outdated parameters
+    and should be replaced after the next successful login.
+    """
+    if not hashed_password.startswith(ARGON2_PREFIX):
+        return True
+    return _password_hasher.check_needs_rehash(hashed_password)
 
 
 def get_password_hash(password: str) -> str:
@@ -70,7 +138,36 @@ def get_password_hash(password: str) -> str:
     Returns:
         Hashed password string
     """
-    return pwd_context.hash(password)
+    return _password_hasher.hash(password)
+
+
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url, as used for each JWT segment."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# HS256 tokens are built here rather than by jwt.encode: the header segment
+# never changes and the HMAC key schedule is done once, so issuing a token is
+# one payload dump and one digest. Tokens are standard JWTs that jwt.decode
+# verifies; other algorithms go through jwt.encode. They only match
+# jwt.encode's bytes for ASCII claims: orjson writes other characters as raw
+# UTF-8 where PyJWT escapes them, which is equally valid JSON. hashlib's
+# SHA-256 is OpenSSL's, which uses the CPU's SHA extensions where present;
+# deploy on a Python built with OpenSSL (the default) rather than hashlib's
+# slower built-in fallback.
+_jwt_header_segment = _b64url(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+_jwt_hmac = hmac.new(SECRET_KEY.encode(), None, hashlib.sha256)
+
+
+def _encode_hs256(payload: dict) -> str:
+    signing_input = _jwt_header_segment + b"." + _b64url(orjson.dumps(payload))
+    mac = _jwt_hmac.copy()
+    mac.update(signing_input)
+    return (signing_input + b"." + _b64url(mac.digest())).decode()
+
+
+# Seconds a token stays valid when create_access_token isn't given a lifetime
+DEFAULT_TOKEN_LIFETIME = 15 * 60
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -84,12 +181,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         Encoded JWT token string
     """
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    # exp as an integer NumericDate (seconds since the epoch), as jwt.encode
+    # would write it, straight from the clock
+    lifetime = int(expires_delta.total_seconds()) if expires_delta else DEFAULT_TOKEN_LIFETIME
+    to_encode = {**data, "exp": int(time.time()) + lifetime}
+    if ALGORITHM == "HS256":
+        return _encode_hs256(to_encode)
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# Payloads of recently verified tokens, keyed by a digest of the token, so a
+# client's repeat requests skip the signature check and JSON parsing. Entries
+# also expire with the token itself: the payload's exp is checked on every hit.
+# The key is a 128-bit BLAKE2b digest under a random per-process key: cheaper
+# than SHA-256, ample for an in-memory map, and not computable by a client.
+_token_cache_digest_key = secrets.token_bytes(32)
+_token_cache = TTLCache(maxsize=10_000, ttl=min(ACCESS_TOKEN_EXPIRE_MINUTES * 60, 3600))
+_token_cache_lock = threading.Lock()
+
+
+def verify_access_token(token: str) -> dict:
+    """
+    Decode and verify a JWT access token, returning its payload.
 
+    Raises:
+        jwt.InvalidTokenError: If the token is malformed, forged or expired
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16, key=_token_cache_digest_key).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
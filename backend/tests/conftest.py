@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from argon2 import PasswordHasher
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, configure_mappers
+from sqlalchemy.pool import StaticPool
+
+# Settings are read when main is imported; let the suite run without an
+# exported SECRET_KEY (CI sets its own)
+os.environ.setdefault("SECRET_KEY", "test-secret-key-for-local-runs-only-0000")
+
+from main import app
+from dependencies import get_db
+import crud
+import models
+import security
+
+# --- Setup Test DB ---
+# In-memory SQLite: StaticPool hands every session the same connection, so
+# they all see one database, and commits never touch the disk. Being
+# per-process, it is also private to each pytest-xdist worker (gw0, gw1, ...),
+# as is the storage directory, a fresh mkdtemp per run.
+SQLALCHEMY_DATABASE_URL = "sqlite://"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    configure_mappers()
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def no_activity_log_timer():
+    # Every test shares one StaticPool connection, so a timer flush from another
+    # thread could land in the middle of a request's transaction. Readers flush
+    # the buffer themselves; push the max-delay timer past the end of the run
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(crud, "ACTIVITY_LOG_MAX_DELAY", 24 * 60 * 60)
+        yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cheap_password_hashing():
+    # Brute-force resistance is pointless here: swap in the cheapest Argon2id
+    # parameters so registering and logging in cost microseconds, while still
+    # exercising the real hash/verify code
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            security,
+            "_password_hasher",
+            PasswordHasher(time_cost=1, memory_cost=8, parallelism=1, hash_len=8),
+        )
+        yield
+
+
+# Linux's RAM-backed filesystem; other platforms use the default temp dir
+TMPFS_DIR = "/dev/shm"
+
+
+@pytest.fixture(scope="session")
+def setup_database(engine, session_factory):
+    # Patch BASE_DIR (and VERSIONS_DIR) to use a temp directory, on tmpfs
+    # where there is one so uploaded test files stay in RAM
+    tmp_parent = TMPFS_DIR if os.path.isdir(TMPFS_DIR) else None
+    TEST_ROOT = tempfile.mkdtemp(prefix="cdrrmo-test-", dir=tmp_parent)
+    TEST_BASE_DIR = os.path.join(TEST_ROOT, "files")
+    TEST_VERSIONS_DIR = os.path.join(TEST_ROOT, "versions")
+    os.makedirs(TEST_BASE_DIR)
+    os.makedirs(TEST_VERSIONS_DIR)
+    
+    # We need to patch it in main and routers.files
+    # Since we import app from main, and main imports routers, they are already loaded.
+    # We can patch them directly.
+    import main
+    import routers.files
+    
+    original_main_base_dir = main.BASE_DIR
+    original_router_base_dir = routers.files.BASE_DIR
+    original_router_versions_dir = routers.files.VERSIONS_DIR
+    
+    main.BASE_DIR = TEST_BASE_DIR
+    routers.files.BASE_DIR = TEST_BASE_DIR
+    routers.files.VERSIONS_DIR = TEST_VERSIONS_DIR
+    
+    def override_get_db():
+        try:
+            db = session_factory()
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = override_get_db
+    
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+    
+    # Cleanup temp dir
+    shutil.rmtree(TEST_ROOT, ignore_errors=True)
+        
+    # Restore
+    app.dependency_overrides.pop(get_db, None)
+    main.BASE_DIR = original_main_base_dir
+    routers.files.BASE_DIR = original_router_base_dir
+    routers.files.VERSIONS_DIR = original_router_versions_dir
+
+# --- Fixtures ---
+# Session-scoped: one client for the whole run, shared by every test file, and
+# the admin and regular user are created (with a single password hash) once.
+
+@pytest.fixture(scope="session")
+def client(setup_database):
+    return TestClient(app)
+
+TEST_PASSWORD = "password123"
+
+@pytest.fixture(scope="session")
+def test_users(setup_database, session_factory, cheap_password_hashing):
+    # Both accounts share a password: hash it once and insert the rows
+    # directly instead of registering each through POST /users/
+    hashed = security.get_password_hash(TEST_PASSWORD)
+    db = session_factory()
+    try:
+        db.add_all([
+            models.User(username="admin", hashed_password=hashed, is_admin=True),
+            models.User(username="user", hashed_password=hashed, is_admin=False),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def _login(client, username):
+    response = client.post("/users/token", data={"username": username, "password": TEST_PASSWORD})
+    return response.json()["access_token"]
+
+@pytest.fixture(scope="session")
+def admin_token(client, test_users):
+    return _login(client, "admin")
+
+@pytest.fixture(scope="session")
+def uploaded_file(client, admin_token):
+    files = {'file': ('fixture_test.txt', b'Fixture Content', 'text/plain')}
+    response = client.post(
+        "/files/upload/", 
+        headers={"Authorization": f"Bearer {admin_token}"},
+        files=files,
+        data={"folder": "Operation"}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture(scope="session")
+def user_token(client, test_users):
+    return _login(client, "user")
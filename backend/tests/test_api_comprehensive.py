@@ -1,134 +1,42 @@
-import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, configure_mappers
-from sqlalchemy.pool import StaticPool
-import os
-
-from main import app
-from database import Base
-from dependencies import get_db
-import models
-
-# --- Setup Test DB ---
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_comprehensive.db"
-
-if os.path.exists("./test_comprehensive.db"):
-    os.remove("./test_comprehensive.db")
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
-configure_mappers()
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-client = TestClient(app)
-
-import shutil
-
-@pytest.fixture(scope="module", autouse=True)
-def setup_database():
-    # Patch BASE_DIR to use a temp directory
-    TEST_BASE_DIR = "TEST_CDRRMO_FILES"
-    if os.path.exists(TEST_BASE_DIR):
-        shutil.rmtree(TEST_BASE_DIR)
-    os.makedirs(TEST_BASE_DIR)
-    
-    # We need to patch it in main and routers.files
-    # Since we import app from main, and main imports routers, they are already loaded.
-    # We can patch them directly.
-    import main
-    import routers.files
-    
-    original_main_base_dir = main.BASE_DIR
-    original_router_base_dir = routers.files.BASE_DIR
-    
-    main.BASE_DIR = TEST_BASE_DIR
-    routers.files.BASE_DIR = TEST_BASE_DIR
-    
-    models.Base.metadata.create_all(bind=engine)
-    yield
-    models.Base.metadata.drop_all(bind=engine)
-    engine.dispose()
-    if os.path.exists("./test_comprehensive.db"):
-        os.remove("./test_comprehensive.db")
-    
-    # Cleanup temp dir
-    if os.path.exists(TEST_BASE_DIR):
-        shutil.rmtree(TEST_BASE_DIR)
-        
-    # Restore (though module scope means it ends here anyway)
-    main.BASE_DIR = original_main_base_dir
-    routers.files.BASE_DIR = original_router_base_dir
-
-# --- Fixtures ---
-
-@pytest.fixture(scope="module")
-def admin_token():
-    # Register admin
-    client.post("/users/", json={"username": "admin", "password": "password123"})
-    # Login admin
-    response = client.post("/users/token", data={"username": "admin", "password": "password123"})
-    return response.json()["access_token"]
-
-@pytest.fixture(scope="module")
-def uploaded_file(admin_token):
-    files = {'file': ('fixture_test.txt', b'Fixture Content', 'text/plain')}
-    response = client.post(
-        "/files/upload/", 
-        headers={"Authorization": f"Bearer {admin_token}"},
-        files=files,
-        data={"folder": "Operation"}
-    )
-    assert response.status_code == 200
-    return response.json()
+import models
+import routers.files
+from routers.files import invalidate_directory_caches
+from routers.stats import get_folder_size
 
-@pytest.fixture(scope="module")
-def user_token():
-    # Register user
-    client.post("/users/", json={"username": "user", "password": "password123"})
-    # Login user
-    response = client.post("/users/token", data={"username": "user", "password": "password123"})
-    return response.json()["access_token"]
+# The client, database and user/file fixtures are shared from conftest.py
 
 # --- Tests ---
 
-def test_root():
+def test_root(client):
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Welcome to the CDRRMO File Manager API"}
 
 # 1. Authentication & User Management
 
-def test_register_duplicate_admin(admin_token):
+def test_register_duplicate_admin(client, admin_token):
     # Try to register admin again (should fail or return 400 if unique constraint)
     # But our logic says first user is admin. "admin" is already created by fixture.
     response = client.post("/users/", json={"username": "admin", "password": "password123"})
     assert response.status_code == 400
 
-def test_get_users_as_admin(admin_token, user_token):
+def test_get_users_as_admin(client, admin_token, user_token):
     response = client.get("/users/", headers={"Authorization": f"Bearer {admin_token}"})
     assert response.status_code == 200
     assert len(response.json()) >= 2
 
-def test_get_users_as_regular_user_forbidden(user_token):
+def test_get_users_as_regular_user_forbidden(client, user_token):
     response = client.get("/users/", headers={"Authorization": f"Bearer {user_token}"})
     assert response.status_code in [403, 401]
 
 # 2. File Operations
 
-def test_upload_file(admin_token):
+def test_upload_file(client, admin_token):
     files = {'file': ('test.txt', b'Hello World', 'text/plain')}
     response = client.post(
         "/files/upload/", 
@@ -139,7 +47,7 @@ def test_upload_file(admin_token):
     assert response.status_code == 200
     assert response.json()["filename"] == "test.txt"
 
-def test_list_files(admin_token, uploaded_file):
+def test_list_files(client, admin_token, uploaded_file):
     response = client.get("/files/?path=Operation", headers={"Authorization": f"Bearer {admin_token}"})
     assert response.status_code == 200
     assert len(response.json()) >= 1
@@ -147,7 +55,7 @@ def test_list_files(admin_token, uploaded_file):
     filenames = [f["filename"] for f in response.json()]
     assert "fixture_test.txt" in filenames
 
-def test_update_file_instruction(admin_token, uploaded_file):
+def test_update_file_instruction(client, admin_token, uploaded_file):
     # Get file ID first (we can just use uploaded_file["id"] directly, but let's verify list works)
     # But wait, uploaded_file fixture returns the file object.
     file_id = uploaded_file["id"]
@@ -160,7 +68,7 @@ def test_update_file_instruction(admin_token, uploaded_file):
     assert response.status_code == 200
     assert response.json()["instruction"] == "Review this file"
 
-def test_delete_file(admin_token):
+def test_delete_file(client, admin_token):
     # Upload another file to delete
     files = {'file': ('delete_me.txt', b'Delete Me', 'text/plain')}
     client.post(
@@ -180,7 +88,146 @@ def test_delete_file(admin_token):
 
 # 3. Activity Logs
 
-def test_activity_logs(admin_token, uploaded_file):
+def test_activity_logs(client, admin_token, uploaded_file):
     response = client.get("/activity_logs/", headers={"Authorization": f"Bearer {admin_token}"})
     assert response.status_code == 200
     assert len(response.json()) > 0
+
+# 4. Notifications
+
+def _user_id(session_factory, username):
+    db = session_factory()
+    try:
+        return db.query(models.User.id).filter(models.User.username == username).scalar()
+    finally:
+        db.close()
+
+def test_notification_summary_counts_unread_beyond_limit(client, user_token, session_factory):
+    user_id = _user_id(session_factory, "user")
+    db = session_factory()
+    try:
+        db.add_all([
+            models.Notification(user_id=user_id, title=f"Note {i}", message="m", type="info", is_read=(i == 0))
+            for i in range(4)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    unread = client.get("/notifications/unread-count", headers=headers).json()["count"]
+    response = client.get("/notifications/summary?limit=1", headers=headers)
+    assert response.status_code == 200
+    summary = response.json()
+    # The count covers all of the user's notifications, not just the page
+    assert len(summary["items"]) == 1
+    assert summary["unread"] == unread
+    assert summary["unread"] >= 3
+
+# 5. Search, assignment and caches
+
+def _add_files(session_factory, folder, created_ats, owner_id):
+    db = session_factory()
+    try:
+        rows = [
+            models.FileMetadata(filename=f"{folder}_{i}.pdf", folder=folder, owner_id=owner_id, created_at=created_at)
+            for i, created_at in enumerate(created_ats)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+def test_advanced_search_keyset_pages(client, admin_token, session_factory):
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    # Two files share a created_at, so the second page has to break the tie on id
+    created_ats = [base, base + timedelta(minutes=1), base + timedelta(minutes=1), base + timedelta(minutes=2), base + timedelta(minutes=3)]
+    ids = _add_files(session_factory, "KeysetTest", created_ats, _user_id(session_factory, "admin"))
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    seen = []
+    params = {"folder": "KeysetTest", "limit": 2}
+    while True:
+        response = client.get("/files/search/advanced", headers=headers, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        if not page:
+            break
+        seen.extend(f["id"] for f in page)
+        params = {**params, "after_created_at": page[-1]["created_at"], "after_id": page[-1]["id"]}
+
+    expected = [i for _, i in sorted(zip(created_ats, ids), reverse=True)]
+    assert seen == expected
+
+def test_batch_assign_ignores_duplicate_ids(client, admin_token, session_factory):
+    user_id = _user_id(session_factory, "user")
+    ids = _add_files(session_factory, "AssignTest", [datetime(2024, 2, 1)] * 2, _user_id(session_factory, "admin"))
+
+    response = client.post(
+        "/files/batch/assign",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json={"file_ids": [ids[0], ids[0], ids[1]], "assigned_to_id": user_id},
+    )
+    assert response.status_code == 200
+    assert response.json()["message"] == "Assigned 2 files to user"
+
+    db = session_factory()
+    try:
+        notified = db.query(models.Notification.related_file_id).filter(
+            models.Notification.user_id == user_id,
+            models.Notification.related_file_id.in_(ids),
+        ).all()
+    finally:
+        db.close()
+    assert sorted(file_id for file_id, in notified) == sorted(ids)
+
+def test_clear_directory_caches(client, admin_token, user_token):
+    response = client.post("/files/cache/clear", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert isinstance(response.json()["cleared"], int)
+
+    response = client.post("/files/cache/clear", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code in [403, 401]
+
+def test_copying_routes_run_in_threadpool():
+    # Version snapshots and cross-filesystem moves may fall back to a full
+    # _fastcopy, which must never run on the event loop
+    for route in (routers.files.upload_file, routers.files.restore_file_version, routers.files.bulk_move_files):
+        assert not inspect.iscoroutinefunction(route)
+
+# 6. Storage statistics
+
+def test_folder_sizes_in_parallel_with_invalidation(tmp_path):
+    # The dashboard sizes its folders on a thread pool while uploads, moves and
+    # deletes invalidate the shared directory size cache
+    expected = {}
+    for folder in ("Operation", "Research", "Training"):
+        for sub in range(20):
+            sub_dir = tmp_path / folder / f"sub{sub}"
+            sub_dir.mkdir(parents=True)
+            (sub_dir / "file.bin").write_bytes(b"x" * (sub + 1))
+        expected[str(tmp_path / folder)] = sum(range(1, 21))
+
+    stop = threading.Event()
+    errors = []
+
+    def invalidate():
+        while not stop.is_set():
+            try:
+                invalidate_directory_caches(str(tmp_path), recursive=True)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    invalidator = threading.Thread(target=invalidate)
+    invalidator.start()
+    try:
+        with ThreadPoolExecutor(max_workers=len(expected)) as executor:
+            for _ in range(200):
+                sizes = list(executor.map(get_folder_size, expected))
+                assert sizes == list(expected.values())
+    finally:
+        stop.set()
+        invalidator.join()
+    assert errors == []
@@ -1,13 +1,10 @@
-from fastapi.testclient import TestClient
-from main import app
+# client is the shared session fixture from conftest.py
 
-client = TestClient(app)
-
-def test_read_main():
+def test_read_main(client):
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Welcome to the CDRRMO File Manager API"}
     
-def test_docs():
+def test_docs(client):
     response = client.get("/docs")
     assert response.status_code == 200
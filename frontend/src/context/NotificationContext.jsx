@@ -16,12 +16,9 @@ export function NotificationProvider({ children }) {
 
         try {
             setLoading(true);
-            const [notifResponse, countResponse] = await Promise.all([
-                api.get('/notifications/', { params: { limit: 20 } }),
-                api.get('/notifications/unread-count')
-            ]);
-            setNotifications(notifResponse.data);
-            setUnreadCount(countResponse.data.count);
+            const response = await api.get('/notifications/summary', { params: { limit: 20 } });
+            setNotifications(response.data.items);
+            setUnreadCount(response.data.unread);
         } catch (error) {
             console.error('Failed to fetch notifications:', error);
         } finally {